@@ -0,0 +1,199 @@
+#########################################################################################
+#                               ETMLQuizAnalytics                                       #
+#########################################################################################
+# Description :                                                                         #
+# Analyse des items d'un quiz à partir des réponses enregistrées par serverQuiz.py.     #
+# Les réponses sont chargées dans une matrice compacte (un code par étudiant et par     #
+# question) et les statistiques classiques sont calculées de manière vectorisée :       #
+# indice de difficulté, discrimination point-bisériale, fréquence des distracteurs et   #
+# alpha de Cronbach. Le rapport est enregistré à côté du module de quiz.                #
+#                                                                                       #
+# Utilisation : python ETMLQuizAnalytics.py Exemple.quiz quiz_module_Exemple            #
+# Nécessite NumPy : pip install numpy                                                   #
+#########################################################################################
+
+# Importation des modules nécessaires
+import os  # Module pour interagir avec le système d'exploitation
+import csv  # Module pour la lecture et l'écriture de fichiers CSV
+import json  # Module pour le rapport JSON
+import argparse  # Module pour les options de la ligne de commande
+
+try:
+    import numpy as np  # Calcul vectorisé sur la matrice des réponses
+except ImportError:
+    raise SystemExit("ETMLQuizAnalytics nécessite NumPy : pip install numpy")
+
+from ETMLQuizBuilder import load_quiz, parse_choice
+from ETMLQuizRuntime import CsvStorage  # Lecture de responses.csv (en-tête, lignes avec ou sans score)
+
+# Nombre de lignes du CSV décodées à la fois
+CHUNK_SIZE = 65536
+
+# Définition des fonctions
+def choice_labels(quiz):
+    # Lettres des choix de chaque question, dans l'ordre du quiz
+    return [[parse_choice(choice)[0] for choice in choices] for _, choices, _ in quiz]
+
+def code_dtype(labels):
+    # Un code par réponse : masque de bits des choix cochés (bit i = i-ème choix, 0 = sans réponse).
+    # uint8 suffit jusqu'à 8 choix par question
+    most_choices = max((len(question_labels) for question_labels in labels), default=0)
+    return np.uint8 if most_choices <= 8 else np.uint16 if most_choices <= 16 else np.uint32
+
+def encode_answer(answer, question_labels):
+    # Code (masque de bits) d'une réponse "b" ou "a,c" ; les lettres inconnues sont ignorées
+    code = 0
+    for letter in answer.split(',') if answer else ():
+        if letter in question_labels:
+            code |= 1 << question_labels.index(letter)
+    return code
+
+def answer_key_codes(quiz, labels, dtype):
+    # Codes des réponses correctes de chaque question
+    return np.array([
+        encode_answer(','.join(parse_choice(choice)[0] for choice in correct_choices), question_labels)
+        for (_, _, correct_choices), question_labels in zip(quiz, labels)
+    ], dtype=dtype)
+
+def _encode_chunk(rows, labels, dtype):
+    # Décode un bloc de lignes : une passe np.unique par colonne, puis table de correspondance
+    # des quelques réponses distinctes vers leur code (aucune boucle Python par cellule)
+    answers = np.array(rows, dtype=str).reshape(len(rows), len(labels))
+    codes = np.empty(answers.shape, dtype=dtype)
+    for i, question_labels in enumerate(labels):
+        values, inverse = np.unique(answers[:, i], return_inverse=True)
+        lookup = np.array([encode_answer(value, question_labels) for value in values], dtype=dtype)
+        codes[:, i] = lookup[inverse]
+    return codes
+
+def load_response_matrix(file_name, labels):
+    # Charge responses.csv (pseudo, réponses..., IP, score) dans une matrice compacte étudiants x questions ;
+    # les lignes sont lues comme par le serveur (CsvStorage), d'après l'en-tête du fichier
+    num_questions = len(labels)
+    dtype = code_dtype(labels)
+    chunks, pseudos, rows = [], [], []
+
+    if not os.path.exists(file_name):
+        raise SystemExit(f"Fichier de réponses introuvable : {file_name}")
+    for submission in CsvStorage(file_name, num_questions).iter_submissions():
+        pseudos.append(submission.pseudo)
+        rows.append(submission.answers)
+        if len(rows) == CHUNK_SIZE:
+            chunks.append(_encode_chunk(rows, labels, dtype))
+            rows = []
+
+    if rows:
+        chunks.append(_encode_chunk(rows, labels, dtype))
+    matrix = np.concatenate(chunks) if chunks else np.zeros((0, num_questions), dtype=dtype)
+    return pseudos, matrix
+
+def item_statistics(matrix, key, labels):
+    # Statistiques des items, calculées sur toute la matrice à la fois
+    num_students, num_questions = matrix.shape
+    correct = (matrix == key)  # Réponse exacte (tous les bons choix et seulement eux)
+    scores = correct.sum(axis=1, dtype=np.int64)
+
+    # Indice de difficulté : proportion de réponses correctes
+    difficulty = correct.mean(axis=0) if num_students else np.full(num_questions, np.nan)
+
+    # Discrimination point-bisériale corrigée : corrélation entre l'item et le score sans cet item
+    items = correct.astype(np.float64)
+    rest = scores[:, None] - items
+    items_centered = items - items.mean(axis=0) if num_students else items
+    rest_centered = rest - rest.mean(axis=0) if num_students else rest
+    covariance = (items_centered * rest_centered).sum(axis=0)
+    norm = np.sqrt((items_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        point_biserial = np.where(norm > 0, covariance / norm, np.nan)
+
+    # Fréquence de chaque choix (distracteurs compris) et des questions sans réponse
+    most_choices = max((len(question_labels) for question_labels in labels), default=0)
+    bits = np.arange(most_choices, dtype=matrix.dtype)
+    choice_counts = ((matrix[:, :, None] >> bits) & 1).sum(axis=0, dtype=np.int64)
+    unanswered = (matrix == 0).sum(axis=0)
+
+    # Alpha de Cronbach du quiz entier
+    alpha = float('nan')
+    if num_questions > 1 and num_students > 1:
+        total_variance = scores.var(ddof=1)
+        if total_variance > 0:
+            alpha = num_questions / (num_questions - 1) * (1 - items.var(axis=0, ddof=1).sum() / total_variance)
+
+    return {
+        'students': num_students,
+        'scores': scores,
+        'difficulty': difficulty,
+        'point_biserial': point_biserial,
+        'choice_counts': choice_counts,
+        'unanswered': unanswered,
+        'alpha': alpha,
+    }
+
+def _number(value, digits=4):
+    # Valeur numérique pour les rapports (None si non définie)
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+def write_report(module_dir, quiz, labels, key_letters, stats):
+    # Enregistre le rapport dans le module : item_analysis.csv (une ligne par question) et item_analysis.json
+    most_choices = stats['choice_counts'].shape[1]
+    csv_path = os.path.join(module_dir, 'item_analysis.csv')
+    with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['question', 'cle', 'difficulte', 'point_biserial', 'sans_reponse']
+                        + [f'choix_{i + 1}' for i in range(most_choices)])
+        for i, (question, _, _) in enumerate(quiz):
+            counts = [f'{label}:{count}' for label, count in zip(labels[i], stats['choice_counts'][i])]
+            writer.writerow([question, key_letters[i], _number(stats['difficulty'][i]),
+                             _number(stats['point_biserial'][i]), int(stats['unanswered'][i])] + counts)
+
+    scores = stats['scores']
+    report = {
+        'students': stats['students'],
+        'questions': len(quiz),
+        'mean_score': _number(scores.mean()) if len(scores) else None,
+        'cronbach_alpha': _number(stats['alpha']),
+        'items': [
+            {
+                'question': question,
+                'key': key_letters[i],
+                'difficulty': _number(stats['difficulty'][i]),
+                'point_biserial': _number(stats['point_biserial'][i]),
+                'unanswered': int(stats['unanswered'][i]),
+                'choices': {label: int(count) for label, count in zip(labels[i], stats['choice_counts'][i])},
+            }
+            for i, (question, _, _) in enumerate(quiz)
+        ],
+    }
+    json_path = os.path.join(module_dir, 'item_analysis.json')
+    with open(json_path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    return csv_path, json_path, report
+
+def analyse_module(quiz_file, module_dir, responses_file=None):
+    # Analyse complète : clé de réponses depuis load_quiz, matrice des réponses, statistiques et rapport
+    _, quiz = load_quiz(quiz_file)
+    labels = choice_labels(quiz)
+    dtype = code_dtype(labels)
+    key = answer_key_codes(quiz, labels, dtype)
+    key_letters = [','.join(parse_choice(choice)[0] for choice in correct) for _, _, correct in quiz]
+
+    _, matrix = load_response_matrix(responses_file or os.path.join(module_dir, 'responses.csv'), labels)
+    stats = item_statistics(matrix, key, labels)
+    return write_report(module_dir, quiz, labels, key_letters, stats)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse des items d'un quiz à partir de responses.csv")
+    parser.add_argument('quiz_file', help="fichier .quiz du module (clé de réponses)")
+    parser.add_argument('module_dir', help="dossier quiz_module_* contenant responses.csv")
+    parser.add_argument('--responses', help="fichier de réponses à analyser (défaut : <module>/responses.csv)")
+    args = parser.parse_args(argv)
+
+    csv_path, json_path, report = analyse_module(args.quiz_file, args.module_dir, args.responses)
+    print(f"{report['students']} étudiants, {report['questions']} questions, "
+          f"score moyen {report['mean_score']}, alpha de Cronbach {report['cronbach_alpha']}")
+    print(f"Rapport enregistré dans '{csv_path}' et '{json_path}'.")
+
+# Début du programme principal
+if __name__ == '__main__':
+    main()
@@ -14,262 +14,609 @@
 # Importation des modules nécessaires
 import os  # Module pour interagir avec le système d'exploitation
 import csv  # Module pour la lecture et l'écriture de fichiers CSV
+import re  # Module pour les expressions régulières
+import gzip  # Module pour la précompression des fichiers statiques
+import codecs  # Module pour la gestion des encodages (BOM UTF-8)
+import struct  # Module pour l'encodage binaire de l'index des questions
+import mmap  # Module pour l'ouverture des banques de questions compilées
+import bisect  # Module pour le tirage de questions dans plusieurs thèmes
+from array import array  # Tableaux compacts pour les offsets de l'index
+import json  # Module pour le manifeste de construction
+import random  # Module pour le mélange des variantes du questionnaire
+import time  # Module pour mesurer les durées de construction
+import contextlib  # Module pour la mesure des phases de construction (--profile)
+import cProfile  # Module pour le profil détaillé de la construction (--pstats)
+import shutil  # Module pour la copie des images
+import hashlib  # Module pour les empreintes de contenu
+import difflib  # Module pour associer les questions de deux versions d'un quiz (--watch)
+import argparse  # Module pour les options de la ligne de commande
+import urllib.request  # Module pour le téléchargement du client Socket.IO
+from concurrent.futures import ProcessPoolExecutor  # Construction parallèle des modules
+
+try:
+    import brotli  # Variantes .br des fichiers statiques (optionnel : pip install brotli)
+except ImportError:
+    brotli = None
+
+# Manifeste de construction enregistré dans chaque module de quiz
+MANIFEST_FILE = ".build_manifest.json"
+
+# Fichiers statiques : noms avec empreinte du contenu, listés dans static/assets.json (nom d'origine -> nom produit)
+ASSET_MANIFEST_FILE = "assets.json"
+ASSET_HASH_LENGTH = 10
+
+# Identifiant d'une série de variantes mélangées (empreinte de ses correspondances), envoyé avec les réponses
+VARIANT_SET_ID_LENGTH = 12
+
+# Client Socket.IO intégré aux modules (page des résultats utilisable sans Internet) :
+# téléchargé une seule fois dans le dossier vendor/ à côté du générateur
+SOCKETIO_CLIENT_FILE = "socket.io.min.js"
+SOCKETIO_CLIENT_URL = "https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.3.1/socket.io.min.js"
+VENDOR_DIR = os.environ.get('ETMLQUIZ_VENDOR_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), "vendor"))
+VENDOR_FETCH_TIMEOUT = 5  # secondes
+
+# Code commun aux serveurs (stockage, écriture, résultats), copié dans chaque module à côté de serverQuiz.py
+RUNTIME_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ETMLQuizRuntime.py")
+
+# Empreinte du générateur et du code commun : toute modification des modèles force la reconstruction
+builder_digest = hashlib.sha256()
+for builder_file_name in (__file__, RUNTIME_FILE):
+    with open(builder_file_name, 'rb') as builder_file:
+        builder_digest.update(builder_file.read())
+BUILDER_HASH = builder_digest.hexdigest()
 
 # Définition des fonctions
-def create_css_file(module_dir, file_name, css_content):
-    # Définition des répertoires
-    static_dir = os.path.join(module_dir, "static")
-    css_dir = os.path.join(static_dir, "css")
-    
-    # Vérification et création du répertoire css s'il n'existe pas
-    if not os.path.exists(css_dir):
-        os.makedirs(css_dir)
-    
-    # Chemin complet du fichier css
-    file_path = os.path.join(css_dir, file_name)
-    
-    # Ouverture du fichier en mode écriture et encodage utf-8
-    with open(file_path, "w", encoding="utf-8") as file:
-        # Écriture du contenu CSS dans le fichier
-        file.write(css_content)
-    
-    # Retourne le chemin complet du fichier créé
-    return file_path
+def content_hash(content):
+    # Empreinte SHA-256 d'un contenu texte ou binaire
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+def file_hash(file_name):
+    # Empreinte SHA-256 d'un fichier, lu par blocs
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def record_artifact(manifest, file_path, digest):
+    # Enregistre l'empreinte d'un fichier produit dans le manifeste
+    # et indique s'il doit être (ré)écrit : False s'il est identique à la dernière construction
+    if manifest is None:
+        return True
+    key = os.path.relpath(file_path, manifest['root']).replace(os.sep, '/')
+    manifest['artifacts'][key] = digest
+    if manifest['previous'].get(key) == digest and os.path.exists(file_path):
+        manifest['skipped'] += 1
+        return False
+    manifest['written'] += 1
+    return True
+
+class BuildProfile:
+    # Mesures d'une construction (--profile) : durée, fichiers écrits et octets de chaque phase
+
+    def __init__(self):
+        self.phases = {}  # nom -> {'seconds', 'files', 'bytes'}, dans l'ordre d'exécution
+        self.current = None
+
+    def _entry(self, name):
+        return self.phases.setdefault(name, {'seconds': 0.0, 'files': 0, 'bytes': 0})
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self._entry(name)
+        previous, self.current = self.current, name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name]['seconds'] += time.perf_counter() - start
+            self.current = previous
+
+    def record_file(self, file_path):
+        entry = self._entry(self.current or 'autres')
+        entry['files'] += 1
+        entry['bytes'] += os.path.getsize(file_path)
+
+    def report(self):
+        return {
+            'phases': self.phases,
+            'files': sum(entry['files'] for entry in self.phases.values()),
+            'bytes': sum(entry['bytes'] for entry in self.phases.values()),
+        }
 
-def create_js_file(module_dir, file_name, js_content):
-    # Définition des répertoires
-    static_dir = os.path.join(module_dir, "static")
-    js_dir = os.path.join(static_dir, "js")
-    
-    # Vérification et création du répertoire js s'il n'existe pas
-    if not os.path.exists(js_dir):
-        os.makedirs(js_dir)
-    
-    # Chemin complet du fichier JavaScript
-    file_path = os.path.join(js_dir, file_name)
-    
-    # Ouverture du fichier en mode écriture et encodage utf-8
-    with open(file_path, "w", encoding="utf-8") as file:
-        # Écriture du contenu JavaScript dans le fichier
-        file.write(js_content)
-    
-    # Retourne le chemin complet du fichier créé
+def build_phase(profile, name):
+    # Phase mesurée si la construction est profilée (--profile), sinon sans effet
+    return profile.phase(name) if profile else contextlib.nullcontext()
+
+def record_written(manifest, file_path):
+    # Compte un fichier effectivement écrit dans les mesures de la construction profilée
+    if manifest is not None and manifest.get('profile'):
+        manifest['profile'].record_file(file_path)
+
+def write_text_file(file_path, content, manifest=None):
+    # Écrit un fichier texte, sauf si le manifeste indique que son contenu n'a pas changé
+    # content peut être une chaîne ou un itérable de fragments (écrits au fil de l'eau)
+    if not isinstance(content, str):
+        return write_text_fragments(file_path, content, manifest)
+
+    if record_artifact(manifest, file_path, content_hash(content)):
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        record_written(manifest, file_path)
     return file_path
 
-def load_quiz(file_name):
-    quiz = []  # Liste qui stockera les questions, choix et réponses correctes du quiz
-
-    with open(file_name, 'r', encoding='utf-8') as file:
-        lines = file.readlines()  # Lecture de toutes les lignes du fichier
-        title = lines[0].strip()  # La première ligne contient le titre du quiz
-        question = ''  # Variable pour stocker la question en cours de lecture
-        choices = []  # Liste pour stocker les choix possibles de réponse pour la question
-        correct_choice = ''  # Variable pour stocker la réponse correcte pour la question
-        question_number = 0  # Numéro de la question en cours de lecture
-
-        for line in lines[2:]:
-            line = line.strip()  # Supprimer les espaces vides en début et fin de ligne
-
-            if line:
-                if line.startswith(str(question_number+1) + '.'):
-                    # Si la ligne commence par le numéro de la question suivi d'un point,
-                    # cela signifie qu'une nouvelle question commence
-                    question = line
-                    question_number += 1
-
-                elif line.startswith('a)') or line.startswith('b)') or line.startswith('c)'):
-                    # Si la ligne commence par 'a)', 'b)' ou 'c)', cela signifie que c'est un choix de réponse
-                    choices.append(line)
-                    if line.endswith('$true$'):
-                        # Si la ligne se termine par '$true$', cela indique que c'est la réponse correcte
-                        correct_choice = line
+def write_text_fragments(file_path, fragments, manifest=None):
+    # Écrit les fragments directement dans un fichier temporaire en calculant l'empreinte au passage,
+    # sans jamais assembler le contenu complet en mémoire ; le fichier final n'est remplacé que s'il a changé
+    digest = hashlib.sha256() if manifest is not None else None
+    temp_path = file_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        for fragment in fragments:
+            file.write(fragment)
+            if digest:
+                digest.update(fragment.encode('utf-8'))
+
+    if record_artifact(manifest, file_path, digest and digest.hexdigest()):
+        os.replace(temp_path, file_path)
+        record_written(manifest, file_path)
+    else:
+        os.remove(temp_path)
+    return file_path
 
-            else:
-                # Si la ligne est vide, cela signifie que la question actuelle est terminée
-                # et on peut ajouter la question, les choix et la réponse correcte à la liste du quiz
-                quiz.append((question, choices, correct_choice))
-                choices = []  # Réinitialiser les choix pour la prochaine question
-                correct_choice = ''  # Réinitialiser la réponse correcte pour la prochaine question
-                question = ''  # Réinitialiser la question pour la prochaine question
+def write_binary_file(file_path, data, manifest=None):
+    # Écrit un fichier binaire, sauf si le manifeste indique que son contenu n'a pas changé
+    if record_artifact(manifest, file_path, content_hash(data) if manifest is not None else None):
+        with open(file_path, 'wb') as file:
+            file.write(data)
+        record_written(manifest, file_path)
+    return file_path
 
-    return title, quiz  # Retourner le titre du quiz et la liste des questions, choix et réponses correctes
+def copy_asset_file(source, file_path, manifest=None):
+    # Copie un fichier binaire (image), sauf s'il est inchangé depuis la dernière construction
+    if record_artifact(manifest, file_path, file_hash(source) if manifest is not None else None):
+        shutil.copyfile(source, file_path)
+        record_written(manifest, file_path)
+    return file_path
 
-# Génère le code HTML pour le questionnaire
-def generate_questionnaire_html(title, quiz):
-    form_html = f'''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>{title}</title>
-    <link rel="stylesheet" type="text/css" href="/static/css/styles.css">
-    <script src="/static/js/student_form_script.js" defer></script>
-</head>
-<body>
-    <header>
-        <div id="logo"> </div>
-    </header>
+CSS_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+def minify_css(css):
+    # Supprime commentaires et espaces superflus
+    css = CSS_COMMENT_PATTERN.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+def minify_js(js):
+    # Minification prudente : indentation, lignes vides et lignes de commentaire retirées.
+    # Les retours à la ligne sont conservés, l'insertion automatique des points-virgules reste inchangée
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+def minify_asset(file_name, content):
+    if file_name.endswith('.min.js'):
+        return content  # Déjà minifié
+    if file_name.endswith('.css'):
+        return minify_css(content)
+    if file_name.endswith('.js'):
+        return minify_js(content)
+    return content
+
+def compressed_variants(data):
+    # Variantes précompressées servies selon Accept-Encoding (mtime=0 : même contenu, même fichier .gz)
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return variants
+
+def hashed_asset(file_name, content):
+    # Contenu minifié d'un fichier statique et son nom avec empreinte (styles.3f2a9c1b0d.css)
+    if not isinstance(content, str):
+        content = ''.join(content)
+    data = minify_asset(file_name, content).encode('utf-8')
+    stem, extension = os.path.splitext(file_name)
+    return data, f"{stem}.{content_hash(data)[:ASSET_HASH_LENGTH]}{extension}"
+
+def write_static_asset(module_dir, kind, file_name, content, manifest=None, assets=None):
+    # Écrit un fichier de static/<kind>/. Avec assets, le fichier est minifié, nommé d'après l'empreinte
+    # de son contenu (styles.3f2a9c1b0d.css), accompagné de ses variantes .gz/.br et ajouté à assets
+    asset_dir = os.path.join(module_dir, "static", kind)
+    os.makedirs(asset_dir, exist_ok=True)
+    if assets is None:
+        return write_text_file(os.path.join(asset_dir, file_name), content, manifest)
+
+    data, hashed_name = hashed_asset(file_name, content)
+    file_path = write_binary_file(os.path.join(asset_dir, hashed_name), data, manifest)
+    for suffix, compressed in compressed_variants(data).items():
+        write_binary_file(file_path + suffix, compressed, manifest)
+
+    assets[f"{kind}/{file_name}"] = f"{kind}/{hashed_name}"
+    return file_path
 
-    <form method="POST" action="/submit">
-     <h3 id="error"></h3>
-        <div class="oneQuest show" id="0">
-            <p>Entrez votre pseudo :</p>
-            <input type="text" id="pseudo" name="pseudo">
-        </div>
-       
-'''
-    for i, (question, choices, correct_choice) in enumerate(quiz):
-        form_html += f'<div class="oneQuest" id="{i+1}">\n'
-        form_html += f'<p>{question}</p>\n'
-        for choice in choices:
-            value = choice[0]
-            text = choice[3:].replace("$true$", "")
-            if choice == correct_choice:
-                form_html += f'<label>\n'
-                form_html += f'<input type="radio" name="question_{i}" value="{value}" data-correct="true" /> {text}\n'
-                form_html += f'</label>\n'
+def create_css_file(module_dir, file_name, css_content, manifest=None, assets=None):
+    # Crée un fichier CSS dans static/css (nom avec empreinte et variantes compressées si assets est fourni)
+    return write_static_asset(module_dir, "css", file_name, css_content, manifest, assets)
+
+def create_js_file(module_dir, file_name, js_content, manifest=None, assets=None):
+    # Crée un fichier JavaScript dans static/js (nom avec empreinte et variantes compressées si assets est fourni)
+    return write_static_asset(module_dir, "js", file_name, js_content, manifest, assets)
+
+_vendor_failures = set()  # Téléchargements déjà tentés sans succès dans ce processus
+
+def load_vendor_file(file_name, url):
+    # Contenu d'un fichier tiers du dossier vendor/, téléchargé s'il n'y est pas encore ;
+    # None s'il est absent et inaccessible (construction hors ligne)
+    path = os.path.join(VENDOR_DIR, file_name)
+    if not os.path.exists(path) and url not in _vendor_failures:
+        try:
+            with urllib.request.urlopen(url, timeout=VENDOR_FETCH_TIMEOUT) as response:
+                data = response.read()
+            os.makedirs(VENDOR_DIR, exist_ok=True)
+            with open(path + '.tmp', 'wb') as file:
+                file.write(data)
+            os.replace(path + '.tmp', path)
+        except OSError as error:
+            _vendor_failures.add(url)
+            print(f"Avertissement : téléchargement de '{url}' impossible ({error}) ; "
+                  f"copiez le fichier dans '{VENDOR_DIR}' pour un fonctionnement hors ligne.")
+    if not os.path.exists(path):
+        return None
+    return read_file_content(path)
+
+def asset_url(assets, name):
+    # URL d'un fichier statique : nom avec empreinte d'après le manifeste, sinon nom d'origine
+    return '/static/' + (assets or {}).get(name, name)
+
+# Reconnaissance des lignes du fichier .quiz
+# (espace obligatoire après "12." : "3.14 est..." reste une ligne de continuation)
+QUESTION_PATTERN = re.compile(r'^\d+\.\s+')  # "12. Texte de la question"
+# (une lettre seule avant la parenthèse : "2) ..." reste une ligne de continuation)
+CHOICE_PATTERN = re.compile(r'^([A-Za-z])\)\s*')  # "a) Texte du choix"
+TRUE_MARKER = '$true$'  # Marqueur d'une réponse correcte en fin de ligne
+
+# Format de l'index des questions (<fichier>.quiz.idx) :
+# en-tête (magic, version, taille et date du .quiz, nombre de questions)
+# suivi d'un tableau d'offsets de 8 octets, un par question
+QUIZ_INDEX_MAGIC = b'QIDX'
+QUIZ_INDEX_VERSION = 1
+QUIZ_INDEX_HEADER = struct.Struct('<4sHxxQqQ')
+QUIZ_INDEX_OFFSET_SIZE = 8
+
+def parse_choice(choice):
+    # Sépare une ligne de choix en (lettre, texte sans le marqueur $true$)
+    match = CHOICE_PATTERN.match(choice)
+    label = match.group(1) if match else choice[:1]
+    text = choice[match.end() if match else 3:].replace(TRUE_MARKER, '').strip()
+    return label, text
+
+def answer_key(correct_choices):
+    # Clé de réponse d'une question : lettres correctes séparées par des virgules ("b", "a,c")
+    return ','.join(parse_choice(choice)[0] for choice in correct_choices)
+
+def _iter_lines_with_offsets(file, offset=0):
+    # Parcourt un fichier ouvert en binaire ligne par ligne en conservant l'offset de chaque ligne
+    for raw_line in file:
+        yield offset, raw_line.decode('utf-8')
+        offset += len(raw_line)
+
+def _read_title_line(file):
+    # Lit la première ligne (titre du quiz) en ignorant un éventuel BOM UTF-8
+    raw_line = file.readline()
+    if raw_line.startswith(codecs.BOM_UTF8):
+        raw_line = raw_line[len(codecs.BOM_UTF8):]
+    return raw_line.decode('utf-8').strip(), file.tell()
+
+def _quiz_record(question, choices):
+    # Construit l'enregistrement d'une question : (question, choix, réponses correctes)
+    return question, choices, [choice for choice in choices if choice.endswith(TRUE_MARKER)]
+
+def _iter_quiz_records(lines):
+    # Analyse en une seule passe des lignes (offset, texte) d'un fichier .quiz
+    # et produit les questions une à une sous la forme (offset, enregistrement)
+    question = ''  # Question en cours de lecture
+    choices = []  # Choix possibles de la question en cours
+    question_offset = 0  # Offset de la ligne de la question en cours
+
+    for offset, line in lines:
+        line = line.strip()  # Supprimer les espaces vides en début et fin de ligne
+
+        if not line:
+            # Une ligne vide termine la question en cours
+            if question:
+                yield question_offset, _quiz_record(question, choices)
+            question, choices = '', []
+
+        elif QUESTION_PATTERN.match(line):
+            # Une nouvelle question commence ; la précédente se termine même sans ligne vide
+            if question:
+                yield question_offset, _quiz_record(question, choices)
+            question, choices = line, []
+            question_offset = offset
+
+        elif question and CHOICE_PATTERN.match(line):
+            # Choix de réponse, quel que soit leur nombre ; plusieurs peuvent être marqués $true$
+            choices.append(line)
+
+        elif question:
+            # Ligne de continuation : elle prolonge la question ou le dernier choix
+            if choices:
+                choices[-1] += ' ' + line
             else:
-                form_html += f'<label>\n'
-                form_html += f'<input type="radio" name="question_{i}" value="{value}" /> {text}\n'
-                form_html += f'</label>\n'
-        form_html += '</div>\n'
-
-    form_html += '''
-    <input  id="submitButton" type="submit" value="Submit" style="display:none;" />
-    </form>
-
-     <div class="nav" style="display: flex; flex-direction: row; float: right;">
-
-        <div  onClick="goToPreviousQuestion();" id="previousButton"
-            style="height: 20px;width:50px;text-align:center;margin: 10px; "> << </div>
-
-        <div onClick="goToNextQuestion();" id="nextButton"
-            style="height: 20px;width:50px;text-align:center;margin: 10px;"> >> </div>
-    </div>
-
-    <footer>ETML / CFPV | Quiz serveur | Section informatique</footer>
-</body>
+                question += ' ' + line
 
-</html>
-'''
-    return form_html
-
-# Génère le script JavaScript pour afficher les réponses des étudiants
-def generate_student_response_script(quiz):
-
-    script = '''const socket = io();
-    socket.on('connect', () => {
-        console.log('Connected to server');
-    });
+    # La dernière question est conservée même sans ligne vide finale
+    if question:
+        yield question_offset, _quiz_record(question, choices)
 
-    socket.on('student_count', (count) => {
-        document.getElementById('student-count').textContent = `Nombre d'étudiants ayant répondu : ${count}`;
-    });
+def read_quiz_title(file_name):
+    # Retourne le titre (première ligne) d'un fichier .quiz
+    with open(file_name, 'rb') as file:
+        return _read_title_line(file)[0]
 
-    socket.on('student_response', (data) => {
-        const { pseudo, responses } = data;
-        const tableRow = document.createElement('tr');
-
-        const pseudoCell = document.createElement('td');
-        pseudoCell.textContent = pseudo;
-        tableRow.appendChild(pseudoCell);
-
-        // Récupérer les clés de réponse depuis le quiz
-        const responseKeys = {};
-        '''
-    for i, (question, _, correct_choice) in enumerate(quiz):
-        script += f"responseKeys[{i}] = {repr(correct_choice)};\n"
-
-    script += '''
-        // Parcourir les clés de réponse pour afficher les réponses
-        Object.values(responseKeys).forEach((responseKey, index) => {
-            const response = responses[`Question ${index + 1}`];
-
-            const responseCell = document.createElement('td');
-            responseCell.textContent = response;
-            responseCell.classList.add(response === responseKeys[index][0] ? 'correct' : 'incorrect');
-            tableRow.appendChild(responseCell);
-        });
+def iter_quiz(file_name):
+    # Générateur : produit les questions du fichier une à une sans charger tout le fichier
+    with open(file_name, 'rb') as file:
+        _, offset = _read_title_line(file)
+        for _, record in _iter_quiz_records(_iter_lines_with_offsets(file, offset)):
+            yield record
 
-        // Ajouter la ligne au tableau
-        document.getElementById('student-responses').appendChild(tableRow);
-    });
-
-    socket.on('all_students_submitted', () => {
-        // Tous les étudiants ont répondu, effectuer les actions nécessaires (par exemple, afficher un message)
-        console.log('Tous les étudiants ont répondu');
-    });
-
-    const showSolutionsButton = document.getElementById('show-solutions-btn');
-    const solutionsDiv = document.getElementById('solutions');
-
-    showSolutionsButton.addEventListener('click', () => {
-        solutionsDiv.style.display = 'block';
-    });
-    '''
-    return script
-
-# Génère le code HTML pour les résultats du quiz
-def generate_results_html(num_questions):
-    html_content = f'''<!DOCTYPE html>
-<html>
-<head>
-    <title>Résultats du quiz</title>
-    <link rel="stylesheet" type="text/css" href="/static/css/styles.css">
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.3.1/socket.io.js"></script>
-    <script src="/static/js/student_response_script.js" defer></script>
-</head>
-<body>
-    <h1>Résultats du quiz</h1>
-    <div id="student-count">Nombre d'étudiants ayant répondu : 0</div>
-    <table id="student-responses">
-        <tr>
-            <th>Pseudo</th>
-'''
-    for i in range(num_questions):
-        html_content += f'            <th>Question {i+1}</th>\n'
-
-    html_content += '''        </tr>
-    </table>
-    <button id="show-solutions-btn">Afficher les solutions</button>
-    <div id="solutions" style="display: none;"></div>
-    <footer>ETML / CFPV | Quiz serveur | Section informatique</footer>
-</body>
-</html>
-'''
-    return html_content
-
-# Enregistre le contenu HTML dans un fichier
-def save_html(html_content, file_name):
-    with open(file_name, 'w', encoding='utf-8') as file:
-        file.write(html_content)
-
-# Enregistre le contenu statique dans un fichier
-def save_static_file(content, file_name, folder):
-    with open(os.path.join(folder, file_name), 'w', encoding='utf-8') as file:
-        file.write(content)
-
-def create_quiz_module(file_name):
-    # Crée un module de quiz à partir d'un fichier
-    module_name = os.path.splitext(file_name)[0]
-    module_dir = f"quiz_module_{module_name}"
-    template_dir = os.path.join(module_dir, "templates")
-    static_dir = os.path.join(module_dir, "static")
-    images_dir= os.path.join(static_dir, "images")
-    
-    # Crée les répertoires nécessaires pour le module de quiz
-    os.makedirs(template_dir, exist_ok=True)
-    os.makedirs(static_dir, exist_ok=True)
-    os.makedirs(images_dir, exist_ok=True)
+def load_quiz(file_name):
+    # Retourne le titre du quiz et la liste des questions, choix et réponses correctes
+    return read_quiz_title(file_name), list(iter_quiz(file_name))
+
+def quiz_index_path(file_name):
+    # Chemin par défaut de l'index des questions d'un fichier .quiz
+    return file_name + '.idx'
+
+def build_quiz_index(file_name, index_file=None):
+    # Construit l'index des offsets des questions en une passe, par blocs, sans garder le quiz en mémoire
+    index_file = index_file or quiz_index_path(file_name)
+    source = os.stat(file_name)
+    count = 0
+
+    with open(file_name, 'rb') as file, open(index_file, 'wb') as index:
+        index.write(QUIZ_INDEX_HEADER.pack(QUIZ_INDEX_MAGIC, QUIZ_INDEX_VERSION, 0, 0, 0))
+        _, offset = _read_title_line(file)
+        offsets = array('Q')
+        for question_offset, _ in _iter_quiz_records(_iter_lines_with_offsets(file, offset)):
+            offsets.append(question_offset)
+            if len(offsets) == 4096:
+                count += len(offsets)
+                offsets.tofile(index)
+                offsets = array('Q')
+        count += len(offsets)
+        offsets.tofile(index)
+
+        # L'en-tête est écrit en dernier, une fois le nombre de questions connu
+        index.seek(0)
+        index.write(QUIZ_INDEX_HEADER.pack(QUIZ_INDEX_MAGIC, QUIZ_INDEX_VERSION,
+                                           source.st_size, source.st_mtime_ns, count))
+    return index_file
+
+def _open_quiz_index(file_name, index_file=None):
+    # Ouvre l'index d'un fichier .quiz et le reconstruit s'il est absent ou périmé
+    index_file = index_file or quiz_index_path(file_name)
+    source = os.stat(file_name)
+
+    for _ in range(2):
+        if os.path.exists(index_file):
+            index = open(index_file, 'rb')
+            header = index.read(QUIZ_INDEX_HEADER.size)
+            if len(header) == QUIZ_INDEX_HEADER.size:
+                magic, version, size, mtime_ns, count = QUIZ_INDEX_HEADER.unpack(header)
+                if (magic, version, size, mtime_ns) == (QUIZ_INDEX_MAGIC, QUIZ_INDEX_VERSION,
+                                                        source.st_size, source.st_mtime_ns):
+                    return index, count
+            index.close()
+        build_quiz_index(file_name, index_file)
+
+    raise ValueError(f"Index invalide pour le fichier '{file_name}'")
+
+def count_questions(file_name, index_file=None):
+    # Nombre de questions du quiz, lu dans l'en-tête de l'index
+    index, count = _open_quiz_index(file_name, index_file)
+    index.close()
+    return count
+
+def load_questions(file_name, numbers, index_file=None):
+    # Charge uniquement les questions demandées (numéros à partir de 0) grâce à l'index,
+    # sans analyser le reste du fichier
+    index, count = _open_quiz_index(file_name, index_file)
+    questions = []
+
+    with index, open(file_name, 'rb') as file:
+        for number in numbers:
+            if not 0 <= number < count:
+                raise IndexError(f"Question {number} absente du quiz '{file_name}' ({count} questions)")
+            index.seek(QUIZ_INDEX_HEADER.size + number * QUIZ_INDEX_OFFSET_SIZE)
+            offset = struct.unpack('<Q', index.read(QUIZ_INDEX_OFFSET_SIZE))[0]
+            file.seek(offset)
+            _, record = next(_iter_quiz_records(_iter_lines_with_offsets(file, offset)))
+            questions.append(record)
+
+    return questions
+
+def load_question(file_name, number, index_file=None):
+    # Charge une seule question grâce à l'index
+    return load_questions(file_name, [number], index_file)[0]
+
+# Format des banques de questions compilées (.qbank) :
+# en-tête (magic, version, nombre de questions, position de la table des thèmes),
+# table de nombre + 1 offsets de 8 octets (la question i occupe [offset i, offset i+1[ dans les données),
+# données (une question = un blob JSON UTF-8), puis table des thèmes en JSON.
+# Un thème (tag) regroupe les questions d'un même fichier .quiz, contiguës dans la banque
+QBANK_EXTENSION = '.qbank'
+QBANK_MAGIC = b'QBNK'
+QBANK_VERSION = 1
+QBANK_HEADER = struct.Struct('<4sHxxQQ')
+QBANK_OFFSET = struct.Struct('<Q')
+
+def write_question_bank(file_path, blobs, tags, manifest=None):
+    # Écrit une banque à partir des blobs (bytes) déjà groupés par thème ; tags : liste de (thème, titre, nombre).
+    # Les blobs passent par un fichier temporaire : la banque n'est jamais entièrement en mémoire
+    offsets = array('Q', [0])
+    with open(file_path + '.data', 'w+b') as data:
+        for blob in blobs:
+            data.write(blob)
+            offsets.append(offsets[-1] + len(blob))
+        count = len(offsets) - 1
+        table, start = [], 0
+        for tag, title, size in tags:
+            table.append({'tag': tag, 'title': title, 'start': start, 'end': start + size})
+            start += size
+        if start != count:
+            raise ValueError(f"Les thèmes comptent {start} questions, la banque en contient {count}")
+
+        data_start = QBANK_HEADER.size + QBANK_OFFSET.size * len(offsets)
+        digest = hashlib.sha256()
+        with open(file_path + '.tmp', 'wb') as file:
+            def write(chunk):
+                file.write(chunk)
+                digest.update(chunk)
+
+            write(QBANK_HEADER.pack(QBANK_MAGIC, QBANK_VERSION, count, data_start + data.tell()))
+            write(offsets.tobytes())
+            data.seek(0)
+            for block in iter(lambda: data.read(1 << 16), b''):
+                write(block)
+            write(json.dumps(table, ensure_ascii=False).encode('utf-8'))
+    os.remove(file_path + '.data')
+
+    if record_artifact(manifest, file_path, digest.hexdigest() if manifest is not None else None):
+        os.replace(file_path + '.tmp', file_path)
+        record_written(manifest, file_path)
+    else:
+        os.remove(file_path + '.tmp')
+    return file_path
 
-    # Charge le quiz à partir du fichier
-    title, quiz = load_quiz(file_name)
-    
-    # Génère le code HTML pour le questionnaire, les résultats et le script de réponse des étudiants
-    question_html = generate_questionnaire_html(title, quiz)
-    results_html = generate_results_html(len(quiz))
-    student_response_script = generate_student_response_script(quiz)
-    
-    css_content = """/* Styles Généraux */
+def _quiz_sources(paths):
+    # Fichiers .quiz désignés par une liste de fichiers et de dossiers (dossiers parcourus par ordre alphabétique)
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.quiz'))
+        else:
+            yield path
+
+def compile_question_bank(quiz_files, bank_file):
+    # Compile un ou plusieurs fichiers .quiz en une banque .qbank ; le thème de chaque question
+    # est le nom de son fichier. Les questions sont lues au fil de l'eau (iter_quiz)
+    tags = []
+
+    def blobs():
+        for file_name in _quiz_sources(quiz_files):
+            tag = os.path.splitext(os.path.basename(file_name))[0]
+            count = 0
+            for record in iter_quiz(file_name):
+                count += 1
+                yield json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            tags.append((tag, read_quiz_title(file_name), count))
+
+    write_question_bank(bank_file, blobs(), tags)
+    return bank_file, tags
+
+class QuestionBank:
+    # Banque compilée ouverte en mmap : l'ouverture ne lit que l'en-tête et la table des thèmes,
+    # chaque question n'est décodée qu'à la demande
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(file_name, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, tags_offset = QBANK_HEADER.unpack_from(self.data, 0)
+        if magic != QBANK_MAGIC or version != QBANK_VERSION:
+            self.data.close()
+            raise ValueError(f"'{file_name}' n'est pas une banque de questions compilée")
+        self.data_start = QBANK_HEADER.size + QBANK_OFFSET.size * (self.count + 1)
+        self.tags = {tag['tag']: tag for tag in json.loads(self.data[tags_offset:].decode('utf-8'))}
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.close()
+
+    @property
+    def title(self):
+        # Titre du premier fichier compilé
+        return next(iter(self.tags.values()))['title'] if self.tags else ''
+
+    def blob(self, number):
+        # Question brute (JSON UTF-8), sans décodage
+        if not 0 <= number < self.count:
+            raise IndexError(f"Question {number} absente de la banque '{self.file_name}' ({self.count} questions)")
+        start, end = (QBANK_OFFSET.unpack_from(self.data, QBANK_HEADER.size + QBANK_OFFSET.size * i)[0]
+                      for i in (number, number + 1))
+        return self.data[self.data_start + start:self.data_start + end]
+
+    def question(self, number):
+        # Question dans la structure de load_quiz : (question, choix, réponses correctes)
+        return tuple(json.loads(self.blob(number)))
+
+    def tag_ranges(self, tags=None):
+        # Intervalles [début, fin) des numéros de questions des thèmes retenus (tous par défaut)
+        try:
+            return [(self.tags[tag]['start'], self.tags[tag]['end']) for tag in (tags or self.tags)]
+        except KeyError as error:
+            raise ValueError(f"Thème inconnu dans la banque '{self.file_name}' : {error.args[0]}") from None
+
+def _split_sample(sizes, n):
+    # Répartit n questions entre les thèmes proportionnellement à leur taille (plus forts restes)
+    total = sum(sizes)
+    if not total:
+        return [0] * len(sizes)
+    quotas = [n * size // total for size in sizes]
+    remainders = sorted(range(len(sizes)), key=lambda i: n * sizes[i] % total, reverse=True)
+    for i in remainders[:n - sum(quotas)]:
+        quotas[i] += 1
+    return quotas
+
+def sample_questions(bank, n, tags=None, stratify=False, seed=None):
+    # Tire n numéros de questions distinctes en O(n), sans lire les questions elles-mêmes.
+    # tags : thèmes autorisés (tous par défaut) ; stratify : chaque thème fournit une part proportionnelle à sa taille
+    rng = random.Random(seed)
+    ranges = bank.tag_ranges(tags)
+    sizes = [end - start for start, end in ranges]
+    if not 0 <= n <= sum(sizes):
+        raise ValueError(f"Impossible de tirer {n} questions parmi {sum(sizes)}")
+
+    if stratify:
+        numbers = []
+        for (start, end), quota in zip(ranges, _split_sample(sizes, n)):
+            numbers.extend(rng.sample(range(start, end), quota))
+    else:
+        # Tirage dans la suite des thèmes retenus, ramené aux numéros de la banque
+        bounds = [0]
+        for size in sizes:
+            bounds.append(bounds[-1] + size)
+        numbers = []
+        for position in rng.sample(range(bounds[-1]), n):
+            i = bisect.bisect_right(bounds, position) - 1
+            numbers.append(ranges[i][0] + position - bounds[i])
+    return sorted(numbers)
+
+def load_bank_questions(file_name, numbers=None):
+    # Titre et questions d'une banque compilée : toutes, ou seulement les numéros demandés,
+    # alors renumérotées dans l'ordre de l'examen
+    with QuestionBank(file_name) as bank:
+        if numbers is None:
+            return bank.title, [bank.question(number) for number in range(len(bank))]
+        questions = []
+        for position, number in enumerate(numbers):
+            question, choices, correct_choices = bank.question(number)
+            questions.append((QUESTION_PATTERN.sub(f"{position + 1}. ", question, count=1), choices, correct_choices))
+        return bank.title, questions
+
+# Feuille de style commune aux pages du questionnaire et des résultats
+QUIZ_STYLES = """/* Styles Généraux */
 body {
     position: static;
     width: 90%;
@@ -399,6 +746,12 @@ input[type="submit"]:hover {
     border-bottom: 1px solid #ddd;
 }
 
+/* Espaces remplaçant les lignes non affichées du tableau des résultats */
+#student-responses .spacer td {
+    padding: 0;
+    border: 0;
+}
+
 .incorrect {
     background-color: #ff9999;
     color: #ff0000;
@@ -461,8 +814,146 @@ input[type="submit"]:hover {
     }
   }
 """
-    
-    js_content = """const submitButton = document.getElementById('submitButton');
+
+# Sauvegarde automatique des réponses en cours, placée en tête des scripts du questionnaire :
+# les modifications sont envoyées par Socket.IO (espace /drafts), regroupées et retardées,
+# et le brouillon d'une visite précédente est rendu à la page par restoreDraft (propre à chaque script)
+AUTOSAVE_SCRIPT = """// Sauvegarde automatique : envoi AUTOSAVE_DELAY ms après la dernière modification,
+// au plus tard AUTOSAVE_MAX_DELAY ms après la première ; une seule valeur par question est envoyée.
+// Le client Socket.IO (attribut data-socketio de ce script) est chargé en arrière-plan : le questionnaire
+// reste utilisable sans lui (hors ligne), les modifications sont envoyées une fois la connexion établie
+const AUTOSAVE_DELAY = 1000;
+const AUTOSAVE_MAX_DELAY = 5000;
+const draftClientUrl = document.currentScript ? document.currentScript.dataset.socketio : null;
+const draftForm = document.querySelector('form');
+const draftVariantInput = draftForm.querySelector('input[name="variant"]');
+const draftVariantSet = draftForm.querySelector('input[name="variant_set"]');
+// Variante et série : un brouillon n'est rendu qu'à une page mélangée de la même manière
+const draftVariant = draftVariantInput ? `${draftVariantSet ? draftVariantSet.value : ''}:${draftVariantInput.value}` : null;
+const draftKey = readDraftKey();
+let draftSocket = null;
+let draftChanges = { answers: {} };  // Modifications pas encore envoyées
+let draftPending = false;
+let draftEdited = false;  // L'élève a modifié une réponse depuis le chargement de la page
+let draftTimer = null;
+let draftDeadline = 0;
+
+// Clé du brouillon, conservée par le navigateur d'une visite à l'autre
+function readDraftKey() {
+    try {
+        const storageKey = `quiz-draft:${location.pathname}`;
+        let key = localStorage.getItem(storageKey);
+        if (!key) {
+            key = Date.now().toString(36) + Math.random().toString(36).slice(2);
+            localStorage.setItem(storageKey, key);
+        }
+        return key;
+    } catch (error) {
+        return null;  // Stockage local indisponible (navigation privée) : pas de sauvegarde automatique
+    }
+}
+
+function queueDraftField(name, value) {
+    if (!draftKey) {
+        return;
+    }
+    draftChanges[name] = value;
+    const now = Date.now();
+    if (!draftPending) {
+        draftPending = true;
+        draftDeadline = now + AUTOSAVE_MAX_DELAY;
+    }
+    clearTimeout(draftTimer);
+    draftTimer = setTimeout(sendDraftChanges, Math.min(AUTOSAVE_DELAY, draftDeadline - now));
+}
+
+function queueDraftAnswer(number, values) {
+    draftChanges.answers[number] = values.join(',');
+    queueDraftField('answers', draftChanges.answers);
+}
+
+// Envoie les modifications en attente en un seul message (mis en attente par Socket.IO si la connexion est coupée)
+function sendDraftChanges() {
+    clearTimeout(draftTimer);
+    if (!draftPending || !draftSocket) {
+        return;
+    }
+    draftSocket.emit('draft_save', { draft: draftKey, variant: draftVariant, changes: draftChanges });
+    draftChanges = { answers: {} };
+    draftPending = false;
+}
+
+// Connexion à l'espace /drafts une fois le client Socket.IO chargé
+function startAutosave() {
+    if (typeof io !== 'function') {
+        return;
+    }
+    draftSocket = io('/drafts');
+    // Brouillon d'une visite précédente (page rechargée, téléphone éteint), demandé en un seul aller-retour
+    // et appliqué si l'élève n'a encore rien modifié
+    draftSocket.emit('draft_restore', { draft: draftKey, variant: draftVariant }, (draft) => {
+        if (draft && !draftEdited) {
+            restoreDraft(draft);
+        }
+    });
+    sendDraftChanges();  // Modifications faites pendant le chargement du client
+}
+
+if (draftKey) {
+    if (typeof io === 'function') {
+        startAutosave();
+    } else if (draftClientUrl) {
+        const clientScript = document.createElement('script');
+        clientScript.src = draftClientUrl;
+        clientScript.async = true;
+        clientScript.onload = startAutosave;
+        document.head.appendChild(clientScript);
+    }
+
+    draftForm.addEventListener('change', (event) => {
+        const name = event.target.name || '';
+        if (name.startsWith('question_')) {
+            draftEdited = true;
+            const checked = draftForm.querySelectorAll(`input[name="${name}"]:checked`);
+            queueDraftAnswer(name.slice('question_'.length), Array.from(checked, input => input.value));
+        }
+    });
+
+    document.getElementById('pseudo').addEventListener('input', (event) => {
+        draftEdited = true;
+        queueDraftField('pseudo', event.target.value);
+    });
+
+    // Page masquée (autre application, écran éteint) : envoi immédiat
+    document.addEventListener('visibilitychange', () => {
+        if (document.hidden) {
+            sendDraftChanges();
+        }
+    });
+
+    // Le brouillon est supprimé par le serveur à la réception des réponses finales
+    draftForm.addEventListener('submit', () => {
+        if (!draftForm.elements.draft_key) {
+            const input = document.createElement('input');
+            input.type = 'hidden';
+            input.name = 'draft_key';
+            input.value = draftKey;
+            draftForm.appendChild(input);
+        }
+    });
+}
+
+"""
+
+# Remplace AUTOSAVE_SCRIPT dans les pages rendues par render_quiz (ETMLQuizHost.py n'a pas d'espace /drafts) :
+# aucune connexion Socket.IO n'est ouverte par le questionnaire
+NO_AUTOSAVE_SCRIPT = """// Sans sauvegarde automatique
+function queueDraftField(name, value) {}
+
+"""
+
+# Script de navigation du questionnaire (une question affichée à la fois), précédé de la sauvegarde automatique
+QUESTIONNAIRE_SCRIPT = """const submitButton = document.getElementById('submitButton');
 const previousButton = document.getElementById('previousButton');
 const nextButton = document.getElementById('nextButton');
 const errorElement = document.getElementById('error');
@@ -476,13 +967,26 @@ function getLastQuestionId() {
 
 const nQuestions = getLastQuestionId();
 
+// Clé de soumission propre à cette page : un double envoi est reconnu et ignoré par le serveur
+const submissionKey = Date.now().toString(36) + Math.random().toString(36).slice(2);
+
+// À l'envoi, la clé est ajoutée au formulaire et le bouton désactivé (double clic)
+submitButton.form.addEventListener('submit', () => {
+    const keyInput = document.createElement('input');
+    keyInput.type = 'hidden';
+    keyInput.name = 'submission_key';
+    keyInput.value = submissionKey;
+    submitButton.form.appendChild(keyInput);
+    submitButton.disabled = true;
+});
+
 // Fonction pour vérifier si toutes les radios sont valides
 function validateRadios() {
 
     const currentQuestion = document.querySelector('.oneQuest.show');
 
     if (currentQuestion) {
-        const radioButtons = currentQuestion.querySelectorAll('input[type="radio"]');
+        const radioButtons = currentQuestion.querySelectorAll('input[type="radio"], input[type="checkbox"]');
 
         for (let i = 0; i < radioButtons.length; i++) {
 
@@ -543,6 +1047,7 @@ function goToNextQuestion() {
 
         // Affichage de la prochaine question
         nextQuestion.classList.add('show');
+        queueDraftField('position', parseInt(nextQuestion.id));
 
         // Affichage du bouton "Précédent"
         previousButton.style.display = 'inline';
@@ -566,6 +1071,7 @@ function goToPreviousQuestion() {
 
             // Affichage de la question précédente
             previousQuestion.classList.add('show');
+            queueDraftField('position', parseInt(previousQuestion.id));
 
             // Affichage du bouton "Suivant"
             nextButton.style.display = 'inline';
@@ -581,77 +1087,2097 @@ function goToPreviousQuestion() {
             previousButton.style.display = 'none';
         }
     }
-};"""
+};
+
+// Réponses en cours retrouvées par la sauvegarde automatique : pseudo, choix cochés et question affichée
+function restoreDraft(draft) {
+    const pseudoInput = document.getElementById('pseudo');
+    pseudoInput.value = pseudoInput.value || draft.pseudo;
+    draft.answers.forEach((answer, number) => {
+        answer.split(',').filter(Boolean).forEach(value => {
+            const input = submitButton.form.querySelector(`input[name="question_${number}"][value="${CSS.escape(value)}"]`);
+            if (input) {
+                input.checked = true;
+            }
+        });
+    });
+    const block = document.getElementById(String(draft.position));
+    if (draft.position > 0 && block) {
+        document.querySelector('.oneQuest.show').classList.remove('show');
+        block.classList.add('show');
+        previousButton.style.display = 'inline';
+    }
+}
+"""
+FORM_SCRIPT = AUTOSAVE_SCRIPT + QUESTIONNAIRE_SCRIPT
 
-    css_file_path = create_css_file(module_dir, "styles.css", css_content)
-    js_questions_path = create_js_file(module_dir, "student_form_script.js", js_content)    
-    js_responses_path = create_js_file(module_dir, "student_response_script.js", student_response_script)
+# Squelettes des pages, découpés une seule fois au chargement du module :
+# les fonctions de génération n'y insèrent que les fragments propres à chaque question
+QUESTIONNAIRE_HEAD = '''
+<!DOCTYPE html>
+<html>
+<head>
+    <title>{title}</title>
+    <link rel="stylesheet" type="text/css" href="{styles}">
+    <script src="{form_script}" data-socketio="{socketio_client}" defer></script>
+</head>
+<body>
+    <header>
+        <div id="logo"> </div>
+    </header>
 
-    os.rename("ETML.png",images_dir+"\\ETML.png")
+    <form method="POST" action="submit">{variant_field}
+     <h3 id="error"></h3>
+        <div class="oneQuest show" id="0">
+            <p>Entrez votre pseudo :</p>
+            <input type="text" id="pseudo" name="pseudo">
+        </div>
+       
+'''
 
-    save_html(question_html, os.path.join(template_dir, "Quest.html"))
-    save_html(results_html, os.path.join(template_dir, "Results.html"))
+QUESTIONNAIRE_TAIL = '''
+    <input  id="submitButton" type="submit" value="Submit" style="display:none;" />
+    </form>
 
-    # Generate serverquiz.py
-    server_quiz_content = f'''from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit
-import csv
+     <div class="nav" style="display: flex; flex-direction: row; float: right;">
+
+        <div  onClick="goToPreviousQuestion();" id="previousButton"
+            style="height: 20px;width:50px;text-align:center;margin: 10px; "> << </div>
+
+        <div onClick="goToNextQuestion();" id="nextButton"
+            style="height: 20px;width:50px;text-align:center;margin: 10px;"> >> </div>
+    </div>
+
+    <footer>ETML / CFPV | Quiz serveur | Section informatique</footer>
+</body>
+
+</html>
+'''
+
+# Questionnaire à chargement progressif (--lazy) : la page ne contient que le pseudo et un emplacement
+# pour la question affichée ; sa taille ne dépend pas du nombre de questions
+QUESTIONNAIRE_LAZY_HEAD = '''
+<!DOCTYPE html>
+<html>
+<head>
+    <title>{title}</title>
+    <link rel="stylesheet" type="text/css" href="{styles}">
+    <script src="{form_script}" data-socketio="{socketio_client}" defer></script>
+</head>
+<body>
+    <header>
+        <div id="logo"> </div>
+    </header>
+
+    <form id="quiz-form" method="POST" action="submit" data-total="{num_questions}">
+     <h3 id="error"></h3>
+        <div class="oneQuest show" id="0">
+            <p>Entrez votre pseudo :</p>
+            <input type="text" id="pseudo" name="pseudo">
+        </div>
+        <div id="question"></div>
+'''
+
+# Script du questionnaire à chargement progressif : une seule question dans la page,
+# questions demandées par pages à /questions, les suivantes préchargées pendant la réponse
+LAZY_FORM_SCRIPT = AUTOSAVE_SCRIPT + '''const form = document.getElementById('quiz-form');
+const container = document.getElementById('question');
+const pseudoBlock = document.getElementById('0');
+const submitButton = document.getElementById('submitButton');
+const previousButton = document.getElementById('previousButton');
+const nextButton = document.getElementById('nextButton');
+const errorElement = document.getElementById('error');
+
+const totalQuestions = parseInt(form.dataset.total, 10);
+const PAGE_SIZE = 5;  // Questions par requête
+const PREFETCH = 3;  // Questions chargées à l'avance
+
+const questions = new Map();  // Questions reçues, par numéro
+const pages = new Map();  // Requêtes de pages en cours ou terminées, par offset
+const answers = {};  // Réponses cochées, par numéro de question
+let current = -1;  // -1 : saisie du pseudo
+
+function loadPage(offset) {
+    if (!pages.has(offset)) {
+        const request = fetch(`questions?offset=${offset}&limit=${PAGE_SIZE}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(page => page.questions.forEach(question => questions.set(question.number, question)))
+            .catch(error => {
+                pages.delete(offset);  // Nouvel essai à la prochaine demande
+                throw error;
+            });
+        pages.set(offset, request);
+    }
+    return pages.get(offset);
+}
+
+function loadQuestion(number) {
+    if (questions.has(number)) {
+        return Promise.resolve(questions.get(number));
+    }
+    return loadPage(Math.floor(number / PAGE_SIZE) * PAGE_SIZE).then(() => questions.get(number));
+}
+
+function prefetch(number) {
+    const last = Math.min(number + PREFETCH, totalQuestions - 1);
+    for (let next = number + 1; next <= last; next++) {
+        if (!questions.has(next)) {
+            loadQuestion(next).catch(() => {});
+        }
+    }
+}
+
+function renderQuestion(question) {
+    const block = document.createElement('div');
+    block.className = 'oneQuest show';
+    const text = document.createElement('p');
+    text.textContent = question.text;
+    block.appendChild(text);
+
+    const checked = answers[question.number] || [];
+    question.choices.forEach(([value, label]) => {
+        const choice = document.createElement('label');
+        const input = document.createElement('input');
+        input.type = question.multiple ? 'checkbox' : 'radio';
+        input.name = `question_${question.number}`;
+        input.value = value;
+        input.checked = checked.includes(value);
+        choice.append(input, ' ', label);
+        block.appendChild(choice);
+    });
+    container.replaceChildren(block);
+}
+
+// Enregistre les choix de la question affichée ; false si aucun choix alors qu'il est obligatoire
+function saveAnswer(required) {
+    if (current < 0) {
+        return true;
+    }
+    const values = Array.from(container.querySelectorAll('input:checked'), input => input.value);
+    if (values.length) {
+        answers[current] = values;
+    }
+    if (required && !answers[current]) {
+        errorElement.textContent = 'Veuillez sélectionner une réponse.';
+        return false;
+    }
+    return true;
+}
+
+function showQuestion(number) {
+    errorElement.textContent = '';
+    current = number;
+    if (number >= 0) {
+        queueDraftField('position', number + 1);
+    }
+    pseudoBlock.classList.toggle('show', number < 0);
+    container.replaceChildren();
+
+    const last = number === totalQuestions - 1;
+    previousButton.style.display = number < 0 ? 'none' : 'inline';
+    nextButton.style.display = last ? 'none' : 'inline';
+    submitButton.style.display = last ? 'block' : 'none';
+
+    if (number >= 0) {
+        loadQuestion(number)
+            .then(question => {
+                if (current === number) {
+                    renderQuestion(question);
+                }
+            })
+            .catch(() => {
+                errorElement.textContent = 'Question indisponible, vérifiez la connexion.';
+            });
+    }
+    prefetch(number);
+}
+
+function goToNextQuestion() {
+    if (saveAnswer(true)) {
+        showQuestion(current + 1);
+    }
+}
+
+function goToPreviousQuestion() {
+    saveAnswer(false);
+    showQuestion(current - 1);
+}
+
+// Réponses en cours retrouvées par la sauvegarde automatique : pseudo, choix et question affichée
+function restoreDraft(draft) {
+    const pseudoInput = document.getElementById('pseudo');
+    pseudoInput.value = pseudoInput.value || draft.pseudo;
+    draft.answers.forEach((answer, number) => {
+        if (answer && number < totalQuestions) {
+            answers[number] = answer.split(',');
+        }
+    });
+    if (draft.position > 0) {
+        showQuestion(Math.min(draft.position, totalQuestions) - 1);
+    }
+}
+
+// Clé de soumission propre à cette page : un double envoi est reconnu et ignoré par le serveur
+const submissionKey = Date.now().toString(36) + Math.random().toString(36).slice(2);
+
+function addHiddenInput(name, value) {
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = name;
+    input.value = value;
+    form.appendChild(input);
+}
+
+// À l'envoi, les réponses de toutes les questions sont ajoutées au formulaire en champs cachés
+form.addEventListener('submit', event => {
+    if (!saveAnswer(true)) {
+        event.preventDefault();
+        return;
+    }
+    container.replaceChildren();
+    Object.entries(answers).forEach(([number, values]) => values.forEach(value => {
+        addHiddenInput(`question_${number}`, value);
+    }));
+    addHiddenInput('submission_key', submissionKey);
+    submitButton.disabled = true;
+});
+
+showQuestion(-1);
+'''
+
+RESPONSE_SCRIPT_HEAD = '''const socket = io({ query: { page: location.pathname } });
+    socket.on('connect', () => {
+        console.log('Connected to server');
+    });
+
+    // Clés de réponse du quiz (une par question), construites une seule fois au chargement de la page
+    const responseKeys = [];
+    '''
+
+RESPONSE_SCRIPT_TAIL = '''
+    // Réponses reçues, dans l'ordre ({ pseudo, answers }) ; seules les lignes visibles sont dans le tableau
+    const studentRows = [];
+    const tableBody = document.getElementById('student-rows');
+    const OVERSCAN = 10;  // Lignes rendues en plus au-dessus et au-dessous de la partie visible
+    let rowHeight = 0;  // Hauteur d'une ligne, mesurée sur la première ligne affichée
+    let renderedRange = null;
+    let bottomSpacer = null;
+
+    // Modèle de ligne (pseudo et une cellule par question), cloné pour chaque ligne affichée
+    const rowTemplate = document.createElement('tr');
+    for (let i = 0; i <= responseKeys.length; i++) {
+        rowTemplate.appendChild(document.createElement('td'));
+    }
+
+    // Ligne envoyée par le serveur : compacte [seq, pseudo, réponse 1, ..., réponse n]
+    // ou objet { seq, pseudo, responses: { 'Question 1': ... } }
+    function rowSeq(row) {
+        return Array.isArray(row) ? row[0] : row.seq;
+    }
+
+    function readRow(row) {
+        if (Array.isArray(row)) {
+            return { pseudo: row[1], answers: row.slice(2) };
+        }
+        return { pseudo: row.pseudo, answers: responseKeys.map((_, index) => row.responses[`Question ${index + 1}`]) };
+    }
+
+    // Crée la ligne du tableau pour les réponses d'un étudiant
+    function createStudentRow({ pseudo, answers }) {
+        const tableRow = rowTemplate.cloneNode(true);
+        const cells = tableRow.children;
+        cells[0].textContent = pseudo;
+        responseKeys.forEach((responseKey, index) => {
+            const response = answers[index];
+            cells[index + 1].textContent = response;
+            cells[index + 1].className = response === responseKey ? 'correct' : 'incorrect';
+        });
+        return tableRow;
+    }
+
+    // Espace vide de la hauteur des lignes qui ne sont pas affichées
+    function createSpacer(height) {
+        const spacer = document.createElement('tr');
+        const cell = document.createElement('td');
+        spacer.className = 'spacer';
+        spacer.style.height = `${height}px`;
+        cell.colSpan = responseKeys.length + 1;
+        spacer.appendChild(cell);
+        return spacer;
+    }
+
+    // Affiche uniquement les lignes visibles dans la fenêtre (et OVERSCAN autour),
+    // les autres sont remplacées par deux espaces vides de même hauteur
+    function renderRows() {
+        const height = rowHeight || 40;
+        const offset = -tableBody.getBoundingClientRect().top;
+        const first = Math.min(studentRows.length, Math.max(0, Math.floor(offset / height) - OVERSCAN));
+        const last = Math.min(studentRows.length, Math.max(first, Math.ceil((offset + window.innerHeight) / height) + OVERSCAN));
+        if (renderedRange && renderedRange[0] === first && renderedRange[1] === last) {
+            // Lignes affichées inchangées : seules des réponses hors de la partie visible ont été ajoutées
+            bottomSpacer.style.height = `${(studentRows.length - last) * height}px`;
+            return;
+        }
+
+        // Remplacer les lignes du tableau en une seule opération
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(createSpacer(first * height));
+        for (let i = first; i < last; i++) {
+            fragment.appendChild(createStudentRow(studentRows[i]));
+        }
+        bottomSpacer = createSpacer((studentRows.length - last) * height);
+        fragment.appendChild(bottomSpacer);
+        tableBody.replaceChildren(fragment);
+        renderedRange = [first, last];
+
+        if (!rowHeight && last > first) {
+            // Première ligne affichée : hauteur réelle mesurée, rendu corrigé à l'image suivante
+            rowHeight = tableBody.children[1].getBoundingClientRect().height;
+            if (rowHeight) {
+                renderedRange = null;
+                scheduleFrame();
+            }
+        }
+    }
+
+    // Version des résultats déjà reçus (numéro de la dernière réponse)
+    let lastVersion = 0;
+    let snapshotPending = false;
+
+    // Ajoute les réponses qui suivent directement la version reçue ;
+    // retourne false si des réponses manquent (mise à jour perdue pendant une déconnexion)
+    function applyRows(rows) {
+        let complete = true;
+        rows.forEach((row) => {
+            const seq = rowSeq(row);
+            if (seq === lastVersion + 1) {
+                studentRows.push(readRow(row));
+                lastVersion = seq;
+            } else if (seq > lastVersion + 1) {
+                complete = false;
+            }
+        });
+        return complete;
+    }
+
+    // Mises à jour reçues, appliquées ensemble à l'image suivante (requestAnimationFrame) :
+    // un seul rendu du tableau quel que soit le nombre de mises à jour arrivées entre-temps
+    const pendingUpdates = [];
+    let frameRequested = false;
+
+    function scheduleFrame() {
+        if (!frameRequested) {
+            frameRequested = true;
+            requestAnimationFrame(flushUpdates);
+        }
+    }
+
+    function queueUpdate(update) {
+        pendingUpdates.push(update);
+        scheduleFrame();
+    }
+
+    function flushUpdates() {
+        frameRequested = false;
+        let totals = null;
+        pendingUpdates.splice(0).forEach((update) => {
+            if (applyRows(update.rows)) {
+                totals = update;
+            } else {
+                fetchSnapshot();
+            }
+        });
+        if (totals) {
+            applyTotals(totals);
+        }
+        renderRows();
+    }
+
+    // Défilement et redimensionnement : nouvelles lignes visibles, rendues à l'image suivante
+    window.addEventListener('scroll', scheduleFrame, { passive: true });
+    window.addEventListener('resize', () => {
+        rowHeight = 0;
+        renderedRange = null;
+        scheduleFrame();
+    });
+
+    function applyTotals(update) {
+        document.getElementById('student-count').textContent = `Nombre d'étudiants ayant répondu : ${update.student_count}`;
+
+        Object.entries(update.questions).forEach(([index, stats]) => {
+            const statsCell = document.getElementById(`question-stats-${index}`);
+            statsCell.textContent = `${stats.percent}%`;
+            statsCell.title = Object.entries(stats.counts).map(([choice, count]) => `${choice}) ${count}`).join(', ');
+        });
+        applyScores(update);
+    }
+
+    // Classement et répartition des scores calculés par le serveur (absents si le serveur ne corrige pas)
+    function applyScores(update) {
+        if (!update.leaderboard) {
+            return;
+        }
+        const maxScore = update.histogram.length - 1;
+        document.getElementById('scores').hidden = false;
+        document.getElementById('leaderboard').replaceChildren(...update.leaderboard.map(({ pseudo, score }) => {
+            const item = document.createElement('li');
+            item.textContent = `${pseudo} : ${score}/${maxScore}`;
+            return item;
+        }));
+        document.getElementById('score-histogram').replaceChildren(...update.histogram.map((count, score) => {
+            const item = document.createElement('li');
+            const meter = document.createElement('meter');
+            meter.max = Math.max(update.student_count, 1);
+            meter.value = count;
+            item.append(`${score}/${maxScore} `, meter, ` ${count}`);
+            return item;
+        }));
+    }
+
+    // Récupère uniquement les réponses postérieures à la dernière version affichée
+    function fetchSnapshot() {
+        if (snapshotPending) {
+            return;
+        }
+        snapshotPending = true;
+        fetch(`results/snapshot?since=${lastVersion}`, { cache: 'no-cache' })
+            .then((response) => (response.status === 304 ? null : response.json()))
+            .then((snapshot) => {
+                if (snapshot) {
+                    queueUpdate(snapshot);
+                }
+            })
+            .finally(() => {
+                snapshotPending = false;
+            });
+    }
+
+    // À la connexion (et reconnexion), rattrapage des réponses déjà reçues par le serveur
+    socket.on('connect', fetchSnapshot);
+
+    // Mise à jour groupée envoyée périodiquement par le serveur :
+    // nouvelles réponses, nombre d'étudiants et totaux des questions
+    socket.on('results_delta', queueUpdate);
+
+    // Quiz modifié et rechargé par le serveur : la page est rechargée avec les nouvelles questions
+    socket.on('quiz_updated', () => {
+        location.reload();
+    });
+
+    socket.on('all_students_submitted', () => {
+        // Tous les étudiants ont répondu, effectuer les actions nécessaires (par exemple, afficher un message)
+        console.log('Tous les étudiants ont répondu');
+    });
+
+    const showSolutionsButton = document.getElementById('show-solutions-btn');
+    const solutionsDiv = document.getElementById('solutions');
+
+    showSolutionsButton.addEventListener('click', () => {
+        solutionsDiv.style.display = 'block';
+    });
+    '''
+
+RESULTS_HEAD = '''<!DOCTYPE html>
+<html>
+<head>
+    <title>Résultats du quiz</title>
+    <link rel="stylesheet" type="text/css" href="{styles}">
+    <script src="{socketio_client}"></script>
+    <script src="{response_script}" defer></script>
+</head>
+<body>
+    <h1>Résultats du quiz</h1>
+    <div id="student-count">Nombre d'étudiants ayant répondu : 0</div>
+    <table id="student-responses">
+        <thead>
+        <tr>
+            <th>Pseudo</th>
+'''
+
+RESULTS_MIDDLE = '''        </tr>
+        </thead>
+        <tbody id="student-rows"></tbody>
+        <tfoot>
+            <tr id="question-stats">
+                <td>% correct</td>
+'''
+
+RESULTS_TAIL = '''            </tr>
+        </tfoot>
+    </table>
+    <div id="scores" hidden>
+        <h2>Meilleurs scores</h2>
+        <ol id="leaderboard"></ol>
+        <h2>Répartition des scores</h2>
+        <ul id="score-histogram"></ul>
+    </div>
+    <button id="show-solutions-btn">Afficher les solutions</button>
+    <div id="solutions" style="display: none;"></div>
+    <footer>ETML / CFPV | Quiz serveur | Section informatique</footer>
+</body>
+</html>
+'''
+
+def socketio_client_url(assets):
+    # Client Socket.IO : copie locale avec empreinte si elle a pu être téléchargée, sinon CDN
+    name = f'js/{SOCKETIO_CLIENT_FILE}'
+    return asset_url(assets, name) if name in (assets or {}) else SOCKETIO_CLIENT_URL
+
+# Produit le code HTML du questionnaire fragment par fragment (un fragment par question)
+# assets : manifeste des fichiers statiques avec empreinte (noms d'origine si absent)
+# variant : numéro de la variante mélangée, envoyé avec les réponses avec l'identifiant de sa série (variant_set)
+def iter_questionnaire_html(title, quiz, assets=None, variant=None, variant_set=None):
+    variant_field = '' if variant is None else (f'\n        <input type="hidden" name="variant" value="{variant}">'
+                                                f'\n        <input type="hidden" name="variant_set" value="{variant_set}">')
+    yield QUESTIONNAIRE_HEAD.format(title=title, styles=asset_url(assets, 'css/styles.css'),
+                                    socketio_client=socketio_client_url(assets),
+                                    form_script=asset_url(assets, 'js/student_form_script.js'),
+                                    variant_field=variant_field)
+
+    for i, (question, choices, correct_choices) in enumerate(quiz):
+        # Plusieurs réponses correctes : cases à cocher au lieu de boutons radio
+        input_type = "checkbox" if len(correct_choices) > 1 else "radio"
+        parts = [f'<div class="oneQuest" id="{i+1}">\n<p>{question}</p>\n']
+        for choice in choices:
+            value, text = parse_choice(choice)
+            correct = ' data-correct="true"' if choice in correct_choices else ''
+            parts.append(f'<label>\n<input type="{input_type}" name="question_{i}" value="{value}"{correct} /> {text}\n</label>\n')
+        parts.append('</div>\n')
+        yield ''.join(parts)
+
+    yield QUESTIONNAIRE_TAIL
+
+# Génère le code HTML pour le questionnaire
+def generate_questionnaire_html(title, quiz, assets=None, variant=None, variant_set=None):
+    return ''.join(iter_questionnaire_html(title, quiz, assets, variant, variant_set))
+
+def shuffle_quiz(quiz, seed):
+    # Variante du quiz aux questions et choix mélangés, dans la structure de load_quiz :
+    # les questions sont renumérotées et les lettres des choix réattribuées selon leur position affichée.
+    # Retourne la variante et sa correspondance avec le quiz d'origine
+    rng = random.Random(seed)
+    order = list(range(len(quiz)))
+    rng.shuffle(order)
+    variant, permutations = [], []
+    for position, number in enumerate(order):
+        question, choices, correct_choices = quiz[number]
+        labels = [parse_choice(choice)[0] for choice in choices]
+        permutation = list(range(len(choices)))
+        rng.shuffle(permutation)
+        shuffled = [
+            f"{labels[shown]}) {parse_choice(choices[original])[1]}"
+            + (f" {TRUE_MARKER}" if choices[original] in correct_choices else '')
+            for shown, original in enumerate(permutation)
+        ]
+        variant.append(_quiz_record(QUESTION_PATTERN.sub(f"{position + 1}. ", question, count=1), shuffled))
+        permutations.append(permutation)
+    return variant, {'questions': order, 'choices': permutations}
+
+# Génère le code HTML du questionnaire à chargement progressif (questions chargées depuis /questions)
+def generate_lazy_questionnaire_html(title, num_questions, assets=None):
+    return QUESTIONNAIRE_LAZY_HEAD.format(
+        title=title, num_questions=num_questions, styles=asset_url(assets, 'css/styles.css'),
+        socketio_client=socketio_client_url(assets), form_script=asset_url(assets, 'js/student_lazy_script.js'),
+    ) + QUESTIONNAIRE_TAIL
+
+# Produit le script JavaScript d'affichage des réponses fragment par fragment
+def iter_student_response_script(quiz):
+    yield RESPONSE_SCRIPT_HEAD
+    for i, (question, _, correct_choices) in enumerate(quiz):
+        yield f"responseKeys[{i}] = {repr(answer_key(correct_choices))};\n    "
+    yield RESPONSE_SCRIPT_TAIL
+
+# Génère le script JavaScript pour afficher les réponses des étudiants
+def generate_student_response_script(quiz):
+    return ''.join(iter_student_response_script(quiz))
+
+# Produit le code HTML des résultats fragment par fragment
+# Le client Socket.IO vient du CDN s'il n'a pas pu être intégré au module
+def iter_results_html(num_questions, assets=None):
+    yield RESULTS_HEAD.format(
+        styles=asset_url(assets, 'css/styles.css'),
+        socketio_client=socketio_client_url(assets),
+        response_script=asset_url(assets, 'js/student_response_script.js'),
+    )
+    for i in range(num_questions):
+        yield f'            <th>Question {i+1}</th>\n'
+    yield RESULTS_MIDDLE
+    for i in range(num_questions):
+        yield f'                <td id="question-stats-{i}">-</td>\n'
+    yield RESULTS_TAIL
+
+# Génère le code HTML pour les résultats du quiz
+def generate_results_html(num_questions, assets=None):
+    return ''.join(iter_results_html(num_questions, assets))
+
+# Code du serveur généré (serverQuiz.py), découpé en sections assemblées par generate_server_script.
+# Les sections sont du code Python brut (sans f-string) : seul l'en-tête reçoit les valeurs du quiz.
+SERVER_HEADER = '''import argparse
 import os
 
-def save_responses_to_csv(responses):
-    with open('responses.csv', 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(responses.values())
+# Code commun aux serveurs de quiz (copie de ETMLQuizRuntime.py) : bibliothèque standard seulement,
+# importable avant le monkey patching du mode prod
+from ETMLQuizRuntime import (CsvStorage, ResponseWriter, ResultsAggregator, SqliteStorage, Submission,
+                             SubmissionIndex, TokenBucket, score_answers, select_async_mode, serve_gevent,
+                             snapshot_response)
+
+# Mode du serveur choisi à la génération : 'dev' (serveur de développement Flask, debug)
+# ou 'prod' (serveur asynchrone eventlet ou gevent, sans debug) ; modifiable par --mode
+SERVER_MODE = os.environ.get('QUIZ_SERVER_MODE', {mode!r})
+
+# Stockage des réponses choisi à la génération : 'csv' (responses.csv) ou 'sqlite' (responses.db, mode WAL)
+STORAGE_BACKEND = os.environ.get('QUIZ_STORAGE', {storage!r})
+
+def parse_server_arguments():
+    # Options de lancement du serveur, lues avant tout import de Flask
+    # pour que le serveur asynchrone puisse adapter la bibliothèque standard (monkey patching)
+    parser = argparse.ArgumentParser(description="Serveur du module de quiz")
+    parser.add_argument('--host', default='127.0.0.1', help="adresse d'écoute (0.0.0.0 pour le réseau local)")
+    parser.add_argument('--port', type=int, default=8000, help="port d'écoute (défaut : 8000)")
+    parser.add_argument('--mode', choices=['dev', 'prod'], default=SERVER_MODE, help="serveur de développement ou de production")
+    parser.add_argument('--async-mode', choices=['eventlet', 'gevent'], default=None,
+                        help="bibliothèque asynchrone du mode prod (défaut : gevent, sinon eventlet)")
+    parser.add_argument('--max-connections', type=int, default=1000,
+                        help="connexions simultanées au maximum en mode prod (défaut : 1000)")
+    parser.add_argument('--keepalive', type=float, default=75,
+                        help="délai de maintien des connexions HTTP inactives en secondes, mode prod eventlet (défaut : 75)")
+    parser.add_argument('--ping-interval', type=float, default=25,
+                        help="intervalle des pings Socket.IO en secondes (défaut : 25)")
+    parser.add_argument('--ping-timeout', type=float, default=20,
+                        help="délai de réponse aux pings Socket.IO en secondes (défaut : 20)")
+    parser.add_argument('--storage', choices=['csv', 'sqlite'], default=STORAGE_BACKEND,
+                        help="stockage des réponses : responses.csv ou base SQLite (WAL)")
+    parser.add_argument('--export-csv', metavar='FICHIER',
+                        help="exporte les réponses de la base SQLite au format de responses.csv puis quitte")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="nombre de processus serveur (ports --port, --port+1, ...) reliés par le courtier")
+    parser.add_argument('--message-queue', metavar='URL',
+                        help="courtier partagé par les processus, tcp://hôte:port (lancé par --workers ou --broker)")
+    parser.add_argument('--worker-index', type=int, default=0,
+                        help="numéro du processus ; le processus 0 enregistre les réponses et diffuse les résultats")
+    parser.add_argument('--broker', action='store_true', help="lance uniquement le courtier (plusieurs machines)")
+    parser.add_argument('--broker-port', type=int, default=5600, help="port du courtier (défaut : 5600)")
+    parser.add_argument('--log-level', choices=['debug', 'info', 'warning', 'error'], default=None,
+                        help="niveau du journal (défaut : info en mode dev, warning en mode prod)")
+    parser.add_argument('--log-sample', type=float, default=1.0,
+                        help="fraction des réponses reçues inscrites au journal, niveau info (défaut : 1)")
+    parser.add_argument('--results-format', choices=['objects', 'compact'],
+                        default=os.environ.get('QUIZ_RESULTS_FORMAT', 'objects'),
+                        help="lignes envoyées aux tableaux de bord : objets avec libellés ou tableaux compacts")
+    parser.add_argument('--reload-interval', type=float, default=1.0,
+                        help="intervalle de détection d'une reconstruction du module en secondes, 0 = jamais (défaut : 1)")
+    return parser.parse_known_args()[0]
+
+SERVER_ARGS = parse_server_arguments()
+ASYNC_MODE = select_async_mode(SERVER_ARGS.mode, SERVER_ARGS.async_mode)
+
+from flask import Flask, render_template, request, send_from_directory, session
+from flask_socketio import SocketIO
+import socketio as socketio_lib
+import atexit
+import bisect
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import math
+import mimetypes
+import mmap
+import random
+import secrets
+import signal
+import socket
+import socketserver
+import sqlite3
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Clé de réponses produite par le générateur, chargée une seule fois au démarrage
+ANSWER_KEY_FILE = os.environ.get('QUIZ_ANSWER_KEY', os.path.join(BASE_DIR, {answer_key_file!r}))
+
+# Variantes mélangées du questionnaire (absent si le module n'en a pas)
+VARIANTS_FILE = os.environ.get('QUIZ_VARIANTS', os.path.join(BASE_DIR, {variants_file!r}))
+
+# Manifeste réécrit en dernier par le générateur à chaque reconstruction du module (rechargement à chaud)
+BUILD_MANIFEST_FILE = os.path.join(BASE_DIR, {manifest_file!r})
+
+# Questions précompilées du questionnaire à chargement progressif (absent si le module n'est pas --lazy)
+QUESTION_STORE_FILE = os.environ.get('QUIZ_QUESTION_STORE', os.path.join(BASE_DIR, {question_store_file!r}))
+QUESTION_PAGE_LIMIT = 50  # Questions par page au maximum
+QBANK_HEADER = struct.Struct('<4sHxxQQ')  # En-tête des banques .qbank du générateur
+QBANK_OFFSET = struct.Struct('<Q')
+
+# Nom du quiz, enregistré avec chaque réponse dans la base SQLite
+QUIZ_NAME = {quiz_name!r}
+
+# Écriture des réponses (valeurs modifiables par variables d'environnement)
+CSV_FILE = os.environ.get('QUIZ_CSV_FILE', 'responses.csv')
+DB_FILE = os.environ.get('QUIZ_DB_FILE', 'responses.db')
+WRITER_QUEUE_SIZE = int(os.environ.get('QUIZ_WRITER_QUEUE_SIZE', '10000'))  # réponses en attente au maximum
+WRITER_BATCH_SIZE = int(os.environ.get('QUIZ_WRITER_BATCH_SIZE', '500'))  # réponses écrites par lot au maximum
+WRITER_FLUSH_INTERVAL = float(os.environ.get('QUIZ_WRITER_FLUSH_INTERVAL', '0.05'))  # attente max. pour grouper un lot (s)
+WRITER_FSYNC_INTERVAL = float(os.environ.get('QUIZ_WRITER_FSYNC_INTERVAL', '1.0'))  # délai entre deux fsync (s), 0 = à chaque lot
+
+# Diffusion des résultats : une mise à jour groupée au plus par intervalle (s)
+BROADCAST_INTERVAL = float(os.environ.get('QUIZ_BROADCAST_INTERVAL', '0.25'))
+# Nombre de réponses affichées dans le classement des meilleurs scores
+LEADERBOARD_SIZE = int(os.environ.get('QUIZ_LEADERBOARD_SIZE', '10'))
+
+# Sauvegarde automatique des réponses en cours : base SQLite des brouillons, écrite par lots toutes les N secondes
+DRAFTS_FILE = os.environ.get('QUIZ_DRAFTS_FILE', 'drafts.db')
+DRAFT_FLUSH_INTERVAL = float(os.environ.get('QUIZ_DRAFT_FLUSH_INTERVAL', '5'))
+DRAFT_IDLE_TIMEOUT = 600  # Brouillons écrits et inactifs depuis ce délai (s) : retirés de la mémoire
+DRAFT_MAX_COUNT = int(os.environ.get('QUIZ_DRAFT_MAX_COUNT', '10000'))  # brouillons en mémoire au maximum
+DRAFT_SAVE_RATE = 2  # Sauvegardes par seconde et par connexion (la page en envoie au plus une par seconde)
+DRAFT_SAVE_BURST = 10
+
+# Admission des réponses : file d'écriture pleine (ou courtier occupé), un envoi attend au plus SUBMIT_WAIT
+# secondes qu'une place se libère ; SUBMIT_MAX_PENDING envois attendent en même temps au maximum,
+# les suivants sont refusés aussitôt (503 et Retry-After)
+SUBMIT_MAX_PENDING = int(os.environ.get('QUIZ_SUBMIT_MAX_PENDING', '64'))
+SUBMIT_WAIT = float(os.environ.get('QUIZ_SUBMIT_WAIT', '1.0'))
+# Limitation par adresse IP (seau à jetons) : envois par seconde et rafale autorisée, 0 = sans limite (défaut).
+# Une classe derrière un NAT partage une seule adresse : la rafale doit couvrir tous les élèves
+SUBMIT_RATE = float(os.environ.get('QUIZ_SUBMIT_RATE', '0'))
+SUBMIT_BURST = float(os.environ.get('QUIZ_SUBMIT_BURST', '200'))
+'''
 
-app = Flask(__name__, template_folder='templates', static_folder='static')
+SERVER_CLUSTER = """
+class Broker(socketserver.ThreadingTCPServer):
+    # Courtier de messages minimal (bibliothèque standard) reliant les processus serveur.
+    # Protocole : une ligne JSON par message, {"op": "subscribe"|"publish", "channel": ..., "data": ...}.
+    # Il sert aussi de séquenceur global : chaque message publié reçoit un numéro (seq) par canal
+    # et est transmis à tous les abonnés dans le même ordre
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, BrokerHandler)
+        self.lock = threading.Lock()
+        self.subscribers = {}  # canal -> connexions abonnées
+        self.sequences = {}  # canal -> numéro du dernier message
+
+    def publish(self, channel, data):
+        with self.lock:
+            seq = self.sequences[channel] = self.sequences.get(channel, 0) + 1
+            line = (json.dumps({'channel': channel, 'seq': seq, 'data': data}) + '\\n').encode('utf-8')
+            for handler in list(self.subscribers.get(channel, ())):
+                try:
+                    handler.wfile.write(line)
+                except OSError:
+                    self.subscribers[channel].discard(handler)
+
+    def unsubscribe(self, handler):
+        with self.lock:
+            for handlers in self.subscribers.values():
+                handlers.discard(handler)
+
+class BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            for line in self.rfile:
+                message = json.loads(line)
+                if message['op'] == 'subscribe':
+                    with self.server.lock:
+                        self.server.subscribers.setdefault(message['channel'], set()).add(self)
+                elif message['op'] == 'publish':
+                    self.server.publish(message['channel'], message['data'])
+        except (OSError, ValueError, KeyError):
+            pass
+        finally:
+            self.server.unsubscribe(self)
+
+def start_broker(host, port):
+    broker = Broker((host, port))
+    threading.Thread(target=broker.serve_forever, daemon=True).start()
+    return broker
+
+def broker_address(url):
+    parts = urlsplit(url)
+    if parts.scheme != 'tcp' or not parts.hostname or not parts.port:
+        raise SystemExit(f"Courtier invalide '{url}' : utilisez tcp://hôte:port")
+    return parts.hostname, parts.port
+
+class BrokerClient:
+    # Connexion d'un processus serveur au courtier : publication (connexion partagée) et abonnements
+
+    def __init__(self, url):
+        self.address = broker_address(url)
+        self.lock = threading.Lock()
+        self.sock = None
+
+    def publish(self, channel, data):
+        # False si le courtier est injoignable (le message n'est pas transmis)
+        line = (json.dumps({'op': 'publish', 'channel': channel, 'data': data}) + '\\n').encode('utf-8')
+        with self.lock:
+            try:
+                if self.sock is None:
+                    self.sock = socket.create_connection(self.address, timeout=5)
+                self.sock.sendall(line)
+                return True
+            except OSError:
+                if self.sock is not None:
+                    self.sock.close()
+                self.sock = None
+                return False
+
+    def subscribe(self, channel):
+        # Abonnement établi immédiatement (aucun message publié ensuite n'est manqué),
+        # puis messages lus un à un ; reconnexion automatique si le courtier redémarre
+        sock = socket.create_connection(self.address, timeout=5)
+        sock.settimeout(None)
+        sock.sendall((json.dumps({'op': 'subscribe', 'channel': channel}) + '\\n').encode('utf-8'))
+        return self._messages(channel, sock)
+
+    def _messages(self, channel, sock):
+        while True:
+            try:
+                with sock, sock.makefile('rb') as lines:
+                    for line in lines:
+                        yield json.loads(line)
+            except OSError:
+                pass
+            print(f"Connexion au courtier perdue (canal {channel}), nouvel essai...", file=sys.stderr)
+            while True:
+                time.sleep(1)
+                try:
+                    sock = socket.create_connection(self.address, timeout=5)
+                    sock.settimeout(None)
+                    sock.sendall((json.dumps({'op': 'subscribe', 'channel': channel}) + '\\n').encode('utf-8'))
+                    break
+                except OSError:
+                    continue
+
+class BrokerManager(socketio_lib.PubSubManager):
+    # Gestionnaire de clients Socket.IO partagé par les processus via le courtier :
+    # un emit de n'importe quel processus atteint les clients connectés à tous les autres
+    name = 'broker'
+
+    def __init__(self, url, channel='socketio'):
+        super().__init__(channel=channel)
+        self.broker = BrokerClient(url)
+
+    def _publish(self, data):
+        self.broker.publish(self.channel, data)
+
+    def _listen(self):
+        for message in self.broker.subscribe(self.channel):
+            yield message['data']
+
+def worker_version(port):
+    # Version des résultats d'un processus (dernière réponse appliquée), None s'il ne répond pas
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/results/snapshot?since={2 ** 62}', timeout=2) as response:
+            return json.load(response)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def run_launcher(args):
+    # Lance le courtier puis args.workers processus serveur sur les ports port, port+1, ...
+    # et affiche la version des résultats de chacun : des versions égales indiquent des résultats identiques
+    start_broker('127.0.0.1', args.broker_port)
+    url = f'tcp://127.0.0.1:{args.broker_port}'
+    ports = [args.port + i for i in range(args.workers)]
+    workers = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), *sys.argv[1:], '--workers', '1',
+                          '--port', str(port), '--worker-index', str(i), '--message-queue', url])
+        for i, port in enumerate(ports)
+    ]
+    print(f"Courtier {url}, {len(workers)} processus : " + ', '.join(f'http://{args.host}:{port}' for port in ports))
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    last_status = None
+    try:
+        while all(worker.poll() is None for worker in workers):
+            time.sleep(2)
+            versions = [worker_version(port) for port in ports]
+            status = ' | '.join(f':{port} v{"?" if version is None else version}' for port, version in zip(ports, versions))
+            if status != last_status:
+                known = {version for version in versions if version is not None}
+                print(f"Versions des résultats : {status}" + (" (identiques)" if len(known) == 1 else ""))
+                last_status = status
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Le processus 0 s'arrête en dernier pour enregistrer les réponses encore en transit
+        for worker in workers[1:] + workers[:1]:
+            if worker.poll() is None:
+                worker.terminate()
+                worker.wait()
+
+if SERVER_ARGS.broker:
+    print(f"Courtier à l'écoute sur tcp://{SERVER_ARGS.host}:{SERVER_ARGS.broker_port}")
+    start_broker(SERVER_ARGS.host, SERVER_ARGS.broker_port).serve_forever()
+    sys.exit(0)
+
+if SERVER_ARGS.workers > 1:
+    run_launcher(SERVER_ARGS)
+    sys.exit(0)
+
+# Processus relié à d'autres par le courtier : toutes les réponses passent par le courtier,
+# seul le processus 0 les enregistre et diffuse les résultats
+CLUSTER_URL = SERVER_ARGS.message_queue
+IS_LEADER = SERVER_ARGS.worker_index == 0
+"""
+
+SERVER_METRICS = """
+class Counter:
+    # Compteur au format Prometheus : valeur qui ne fait qu'augmenter
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+class Gauge:
+    # Jauge au format Prometheus : valeur courante, tenue à jour (inc/dec) ou lue par 'read' à chaque export
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, read=None):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def samples(self):
+        return [(self.name, self.read() if self.read else self.value)]
+
+class Histogram:
+    # Histogramme au format Prometheus : nombre d'observations par borne, somme et total
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = list(buckets)
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)  # Dernière case : au-delà de la plus grande borne
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        samples, cumulative = [], 0
+        for bound, count in zip([f'{bound:g}' for bound in self.buckets] + ['+Inf'], counts):
+            cumulative += count
+            samples.append((f'{self.name}_bucket{{le="{bound}"}}', cumulative))
+        return samples + [(f'{self.name}_sum', total), (f'{self.name}_count', cumulative)]
+
+def timed(histogram):
+    # Décorateur : durée de chaque appel observée dans l'histogramme
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5]
+
+SUBMISSIONS = Counter('quiz_submissions_total', "Réponses acceptées")
+SUBMISSIONS_REJECTED = Counter('quiz_submissions_rejected_total', "Réponses refusées (file d'écriture pleine ou courtier injoignable)")
+SUBMISSIONS_DUPLICATE = Counter('quiz_submissions_duplicate_total', "Envois en double ignorés (même clé ou même pseudo et session)")
+SUBMISSIONS_THROTTLED = Counter('quiz_submissions_throttled_total', "Envois refusés par la limitation par adresse IP")
+SUBMIT_LATENCY = Histogram('quiz_submit_duration_seconds', "Durée de traitement de /submit", LATENCY_BUCKETS)
+SOCKETIO_CLIENTS = Gauge('quiz_socketio_clients', "Clients Socket.IO connectés à ce processus")
+BROADCAST_LATENCY = Histogram('quiz_broadcast_duration_seconds', "Durée de diffusion d'une mise à jour des résultats", LATENCY_BUCKETS)
+STORAGE_WRITE_LATENCY = Histogram('quiz_storage_write_duration_seconds', "Durée d'écriture d'un lot de réponses", LATENCY_BUCKETS)
+WRITER_QUEUE_DEPTH = Gauge('quiz_writer_queue_depth', "Réponses en attente d'écriture",
+                           read=lambda: response_writer.queue.qsize() if response_writer else 0)
+WRITER_ERRORS = Counter('quiz_writer_errors_total', "Erreurs du stockage pendant l'écriture des réponses")
+WRITER_FAILED = Gauge('quiz_writer_failed_submissions', "Réponses dont l'écriture a échoué, en attente d'un nouvel essai",
+                      read=lambda: response_writer.failed_count() if response_writer else 0)
+WRITER_HEALTHY = Gauge('quiz_writer_healthy', "1 si le thread d'écriture fonctionne sans lot en échec",
+                       read=lambda: int(response_writer.healthy) if response_writer else 1)
+DRAFT_SAVES = Counter('quiz_draft_saves_total', "Sauvegardes automatiques de réponses en cours reçues")
+DRAFTS_IN_MEMORY = Gauge('quiz_drafts_in_memory', "Brouillons gardés en mémoire", read=lambda: len(draft_store.drafts))
+
+METRICS = [SUBMISSIONS, SUBMISSIONS_REJECTED, SUBMISSIONS_DUPLICATE, SUBMISSIONS_THROTTLED, SUBMIT_LATENCY, SOCKETIO_CLIENTS, BROADCAST_LATENCY,
+           STORAGE_WRITE_LATENCY, WRITER_QUEUE_DEPTH, WRITER_ERRORS, WRITER_FAILED, WRITER_HEALTHY, DRAFT_SAVES,
+           DRAFTS_IN_MEMORY]
+
+def render_metrics():
+    # Texte de /metrics au format d'exposition Prometheus
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.help_text}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(f'{name} {value}' for name, value in metric.samples())
+    return '\\n'.join(lines) + '\\n'
+
+# Journal structuré : une ligne JSON par événement, filtrée par niveau ;
+# les événements fréquents (réponses reçues) sont en plus échantillonnés par --log-sample
+LOG_LEVEL = (SERVER_ARGS.log_level or ('info' if SERVER_ARGS.mode == 'dev' else 'warning')).upper()
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s %(message)s')
+logger = logging.getLogger('quiz')
+# Journal des requêtes du serveur de développement : werkzeug se met lui-même au niveau info s'il n'en a pas,
+# ce qui afficherait une ligne par requête malgré --log-level
+logging.getLogger('werkzeug').setLevel(LOG_LEVEL)
+
+def log_event(level, event, sampled=False, **fields):
+    if not logger.isEnabledFor(level):
+        return
+    if sampled and SERVER_ARGS.log_sample < 1 and random.random() >= SERVER_ARGS.log_sample:
+        return
+    logger.log(level, json.dumps({'event': event, **fields}, ensure_ascii=False))
+"""
+
+SERVER_ANSWER_KEY = """
+def load_answer_key(file_name):
+    # Lit la clé de réponses : une liste de lettres correctes par numéro de question ("b", "a,c")
+    with open(file_name, 'r', encoding='utf-8') as file:
+        return json.load(file)['keys']
+
+ANSWER_KEY = load_answer_key(ANSWER_KEY_FILE)
+
+# Noms des champs du formulaire et libellés des réponses, calculés une fois pour toutes les requêtes
+QUESTION_FIELDS = [f'question_{i}' for i in range(len(ANSWER_KEY))]
+RESPONSE_LABELS = [f'Question {i+1}' for i in range(len(ANSWER_KEY))]
+
+# Clé de réponses, champs, libellés et variantes sont remplacés ensemble par reload_quiz sous ce verrou,
+# et lus sous ce verrou par accept_submission : une réponse n'est jamais corrigée avec un mélange des deux versions
+quiz_lock = threading.Lock()
+
+def load_variants(file_name):
+    # Correspondances des variantes mélangées, préparées une fois au démarrage : pour chaque position affichée,
+    # (numéro de la question d'origine, {lettre affichée: (rang d'origine, lettre d'origine)}).
+    # Retourne (identifiant de la série, correspondances)
+    if not os.path.exists(file_name):
+        return None, []
+    with open(file_name, 'r', encoding='utf-8') as file:
+        content = json.load(file)
+    labels = content['labels']
+    return content.get('id'), [
+        [
+            (number, {labels[number][shown]: (original, labels[number][original])
+                      for shown, original in enumerate(permutation)})
+            for number, permutation in zip(variant['questions'], variant['choices'])
+        ]
+        for variant in content['variants']
+    ]
+
+VARIANT_SET, VARIANTS = load_variants(VARIANTS_FILE)
+# Séries de variantes chargées depuis le démarrage (reconstructions comprises) : une page ouverte avant
+# une reconstruction est corrigée avec les correspondances de sa propre série
+VARIANT_SETS = {VARIANT_SET: VARIANTS}
+
+def canonical_answers(mapping, answers):
+    # Réponses d'une variante remises dans l'ordre du quiz d'origine, avec ses lettres ("a,c" dans l'ordre des choix)
+    canonical = [''] * len(answers)
+    for (number, choices), answer in zip(mapping, answers):
+        selected = sorted(choices[label] for label in answer.split(',') if label in choices)
+        canonical[number] = ','.join(label for _, label in selected)
+    return canonical
+"""
+
+SERVER_STORAGE = """
+def open_storage(backend):
+    if backend == 'sqlite':
+        return SqliteStorage(DB_FILE, QUIZ_NAME)
+    return CsvStorage(CSV_FILE, len(ANSWER_KEY))
+
+response_storage = open_storage(SERVER_ARGS.storage)
+
+if SERVER_ARGS.export_csv:
+    if not isinstance(response_storage, SqliteStorage):
+        raise SystemExit("--export-csv nécessite le stockage SQLite (--storage sqlite)")
+    exported = response_storage.export_csv(SERVER_ARGS.export_csv, len(ANSWER_KEY))
+    print(f"{exported} réponses exportées dans '{SERVER_ARGS.export_csv}'.")
+    sys.exit(0)
+"""
+
+SERVER_WRITER = """
+def shutdown():
+    # Vide la file d'écriture avant de quitter (Ctrl+C, SIGTERM ou fin normale)
+    if response_writer:
+        response_writer.close()
+
+def terminate(signum, frame):
+    # SIGTERM : sortie normale du programme, la file est vidée par shutdown (atexit)
+    sys.exit(0)
+
+def report_write_error(action, storage, error):
+    # Erreur du stockage (disque plein, base verrouillée, droits) : le lot est gardé et réessayé par le thread
+    WRITER_ERRORS.inc()
+    log_event(logging.ERROR, 'storage_error', action=action, error=f'{type(error).__name__}: {error}',
+              waiting=response_writer.failed_count() if response_writer else 0)
+
+# Avec plusieurs processus, seul le processus 0 écrit dans le stockage
+response_writer = ResponseWriter(response_storage, WRITER_QUEUE_SIZE, WRITER_BATCH_SIZE, WRITER_FLUSH_INTERVAL,
+                                 WRITER_FSYNC_INTERVAL, write_latency=STORAGE_WRITE_LATENCY.observe,
+                                 on_error=report_write_error).start() if IS_LEADER else None
+atexit.register(shutdown)
+signal.signal(signal.SIGTERM, terminate)
+"""
+
+SERVER_RESULTS = """
+# Réponses déjà enregistrées rechargées au démarrage, scores recalculés avec la clé de réponses actuelle
+results_aggregator = ResultsAggregator(ANSWER_KEY, RESPONSE_LABELS, compact=SERVER_ARGS.results_format == 'compact',
+                                       leaderboard_size=LEADERBOARD_SIZE).load(response_storage)
+"""
+
+SERVER_ADMISSION = """
+rate_limiter = TokenBucket(SUBMIT_RATE, SUBMIT_BURST)
+submission_index = SubmissionIndex()
+admission = threading.BoundedSemaphore(SUBMIT_MAX_PENDING)
+"""
+
+SERVER_DRAFTS = """
+class Draft:
+    # Brouillon d'un élève, compact : une chaîne par question jusqu'à la dernière répondue ('b', 'a,c', '')
+    __slots__ = ('pseudo', 'variant', 'position', 'answers', 'updated_at')
+
+    def __init__(self, pseudo='', variant=None, position=0, answers=None, updated_at=0.0):
+        self.pseudo = pseudo
+        self.variant = variant
+        self.position = position  # Bloc affiché : 0 = pseudo, i = question i
+        self.answers = answers if answers is not None else []
+        self.updated_at = updated_at
+
+    def as_dict(self):
+        return {'pseudo': self.pseudo, 'position': self.position, 'answers': self.answers}
+
+class DraftStore:
+    # Réponses en cours (sauvegarde automatique), par clé de brouillon : une sauvegarde n'est qu'une mise à jour
+    # en mémoire ; les brouillons modifiés sont écrits par lots dans une base SQLite (flush) et ceux des réponses
+    # reçues supprimés. Les brouillons écrits et inactifs sont retirés de la mémoire, puis relus dans la base
+    # si l'élève revient (un autre processus du serveur, par exemple).
+    MAX_KEY_LENGTH = 64
+    MAX_VALUE_LENGTH = 200
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS drafts ('
+        'quiz TEXT NOT NULL, draft TEXT NOT NULL, pseudo TEXT NOT NULL, variant TEXT, '
+        'position INTEGER NOT NULL, answers TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (quiz, draft));'
+    )
+
+    def __init__(self, file_name, quiz_name, max_count):
+        self.quiz_name = quiz_name
+        self.max_count = max_count
+        self.lock = threading.Lock()
+        self.drafts = {}
+        self.dirty = set()  # Clés des brouillons modifiés depuis le dernier lot
+        self.discarded = set()  # Clés des brouillons à supprimer de la base
+        # Connexion partagée par l'écriture des lots et la lecture des brouillons absents de la mémoire
+        self.db_lock = threading.Lock()
+        self.connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(self.SCHEMA)
+
+    def _valid_key(self, key):
+        return isinstance(key, str) and 0 < len(key) <= self.MAX_KEY_LENGTH
+
+    def _valid_variant(self, variant):
+        # Variante de la page ("série:numéro"), None sans variantes
+        return variant is None or (isinstance(variant, str) and len(variant) <= self.MAX_KEY_LENGTH)
+
+    def _get(self, key):
+        # Brouillon en mémoire, sinon relu dans la base (appelé avec self.lock)
+        draft = self.drafts.get(key)
+        if draft is None and key not in self.discarded:
+            with self.db_lock:
+                row = self.connection.execute(
+                    'SELECT pseudo, variant, position, answers, updated_at FROM drafts WHERE quiz = ? AND draft = ?',
+                    (self.quiz_name, key),
+                ).fetchone()
+            if row:
+                draft = self.drafts[key] = Draft(row[0], row[1], row[2], json.loads(row[3]), row[4])
+        return draft
+
+    def update(self, key, variant, changes):
+        # Applique les modifications regroupées par la page : {'pseudo', 'position', 'answers': {numéro: 'a,c'}} ;
+        # False si elles sont invalides
+        if not self._valid_key(key) or not self._valid_variant(variant) or not isinstance(changes, dict):
+            return False
+        pseudo, position, answers = changes.get('pseudo'), changes.get('position'), changes.get('answers', {})
+        if not (isinstance(pseudo, (str, type(None))) and isinstance(position, (int, type(None)))
+                and isinstance(answers, dict)):
+            return False
+        updates = []
+        for number, value in answers.items():
+            number = int(number) if str(number).isdigit() else -1
+            if not 0 <= number < len(ANSWER_KEY) or not isinstance(value, str) or len(value) > self.MAX_VALUE_LENGTH:
+                return False
+            updates.append((number, value))
+
+        with self.lock:
+            draft = self._get(key)
+            if draft is None and len(self.drafts) >= self.max_count:
+                return False  # Trop de brouillons en mémoire : les nouveaux sont refusés jusqu'au prochain lot
+            if draft is None or draft.variant != variant:
+                draft = self.drafts[key] = Draft(variant=variant)
+            for number, value in updates:
+                if number >= len(draft.answers):
+                    draft.answers.extend([''] * (number + 1 - len(draft.answers)))
+                draft.answers[number] = value
+            if pseudo is not None:
+                draft.pseudo = pseudo[:self.MAX_VALUE_LENGTH]
+            if position is not None:
+                draft.position = max(0, min(position, len(ANSWER_KEY)))
+            draft.updated_at = time.time()
+            self.dirty.add(key)
+            self.discarded.discard(key)
+        return True
+
+    def restore(self, key, variant):
+        # Brouillon à rendre à la page, None s'il n'y en a pas (ou s'il a été fait sur une autre variante)
+        if not self._valid_key(key):
+            return None
+        with self.lock:
+            draft = self._get(key)
+            if draft is None or draft.variant != variant:
+                return None
+            return draft.as_dict()
+
+    def discard(self, key):
+        # Réponses finales reçues : le brouillon est supprimé (de la base au prochain lot)
+        if self._valid_key(key):
+            with self.lock:
+                self.drafts.pop(key, None)
+                self.dirty.discard(key)
+                self.discarded.add(key)
+
+    def flush(self):
+        # Écrit les brouillons modifiés et supprime ceux des réponses reçues, en une seule transaction ;
+        # la base reste verrouillée pendant l'écriture pour qu'un brouillon supprimé ne soit pas relu.
+        # Si l'écriture échoue, les clés du lot sont remises en attente pour le lot suivant
+        now = time.time()
+        with self.db_lock:
+            with self.lock:
+                dirty, discarded = self.dirty, self.discarded
+                self.dirty, self.discarded = set(), set()
+                rows = [(self.quiz_name, key, draft.pseudo, draft.variant, draft.position, json.dumps(draft.answers),
+                         draft.updated_at) for key, draft in ((key, self.drafts[key]) for key in dirty)]
+                removed = [(self.quiz_name, key) for key in discarded]
+            try:
+                if rows or removed:
+                    with self.connection:
+                        self.connection.executemany(
+                            'INSERT OR REPLACE INTO drafts (quiz, draft, pseudo, variant, position, answers, updated_at) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+                        self.connection.executemany('DELETE FROM drafts WHERE quiz = ? AND draft = ?', removed)
+            except sqlite3.Error:
+                # Brouillons modifiés ou supprimés pendant l'écriture : leur état le plus récent l'emporte
+                with self.lock:
+                    self.dirty |= {key for key in dirty if key in self.drafts}
+                    self.discarded |= {key for key in discarded if key not in self.drafts}
+                raise
+            with self.lock:
+                # Seuls les brouillons déjà écrits sont retirés de la mémoire
+                for key in [key for key, draft in self.drafts.items()
+                            if now - draft.updated_at > DRAFT_IDLE_TIMEOUT and key not in self.dirty]:
+                    del self.drafts[key]
+        return len(rows)
+
+    def close(self):
+        # Dernier lot à l'arrêt du serveur (atexit)
+        self.flush()
+        self.connection.close()
+
+draft_store = DraftStore(DRAFTS_FILE, QUIZ_NAME, DRAFT_MAX_COUNT)
+draft_limiter = TokenBucket(DRAFT_SAVE_RATE, DRAFT_SAVE_BURST)  # Sauvegardes par connexion Socket.IO
+atexit.register(draft_store.close)
+"""
+
+SERVER_APP = """
+# Les fichiers statiques sont servis par static_file (cache permanent des fichiers avec empreinte)
+app = Flask(__name__, template_folder='templates', static_folder=None)
 app.config['SECRET_KEY'] = 'secret_key'
-socketio = SocketIO(app)
+socketio = SocketIO(app, async_mode=ASYNC_MODE,
+                    ping_interval=SERVER_ARGS.ping_interval, ping_timeout=SERVER_ARGS.ping_timeout,
+                    client_manager=BrokerManager(CLUSTER_URL) if CLUSTER_URL else None)
+
+def broadcast_results():
+    # Tâche de fond : diffuse au plus une mise à jour groupée par intervalle,
+    # quel que soit le nombre de réponses reçues entre-temps
+    while True:
+        socketio.sleep(BROADCAST_INTERVAL)
+        delta = results_aggregator.take_delta()
+        if delta:
+            start = time.perf_counter()
+            socketio.emit('results_delta', delta)
+            BROADCAST_LATENCY.observe(time.perf_counter() - start)
+
+@socketio.on('connect')
+def client_connected(auth=None):
+    SOCKETIO_CLIENTS.inc()
+
+@socketio.on('disconnect')
+def client_disconnected(*args):
+    SOCKETIO_CLIENTS.dec()
+
+# Sauvegarde automatique : les pages du questionnaire utilisent l'espace /drafts,
+# si bien qu'elles ne reçoivent pas les mises à jour des résultats diffusées aux tableaux de bord
+@socketio.on('draft_save', namespace='/drafts')
+def save_draft(data):
+    DRAFT_SAVES.inc()
+    if not isinstance(data, dict) or draft_limiter.acquire(request.sid):
+        return False
+    return draft_store.update(data.get('draft'), data.get('variant'), data.get('changes'))
+
+@socketio.on('draft_restore', namespace='/drafts')
+def restore_draft(data):
+    # Le brouillon est renvoyé dans l'accusé de réception : un seul aller-retour
+    if not isinstance(data, dict):
+        return None
+    return draft_store.restore(data.get('draft'), data.get('variant'))
+
+def flush_drafts():
+    # Tâche de fond : écrit les brouillons modifiés par lots
+    while True:
+        socketio.sleep(DRAFT_FLUSH_INTERVAL)
+        try:
+            draft_store.flush()
+        except sqlite3.Error as error:
+            log_event(logging.ERROR, 'draft_flush_failed', error=str(error))
+
+socketio.start_background_task(flush_drafts)
+
+def follow_submissions(feed):
+    # Tâche de fond (plusieurs processus) : applique les réponses reçues par tous les processus
+    # dans l'ordre fixé par le courtier, si bien que les résultats sont identiques partout
+    for message in feed:
+        submission = Submission(*message['data'])
+        if response_writer and not response_writer.submit(submission, SUBMIT_WAIT):
+            log_event(logging.ERROR, 'writer_queue_full', pseudo=submission.pseudo)
+        results_aggregator.add(submission.pseudo, submission.answers, submission.ip, submission.score)
+
+if CLUSTER_URL:
+    submission_broker = BrokerClient(CLUSTER_URL)
+    try:
+        socketio.start_background_task(follow_submissions, submission_broker.subscribe('submissions'))
+    except OSError as error:
+        raise SystemExit(f"Courtier {CLUSTER_URL} injoignable : {error}")
+
+# Un seul processus diffuse les résultats ; le gestionnaire Socket.IO les transmet aux autres
+if IS_LEADER:
+    socketio.start_background_task(broadcast_results)
+
+class RenderedPage:
+    # Page rendue une seule fois au démarrage : corps, variante gzip et ETag de chaque variante
+    def __init__(self, body):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9)
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        self.gzip_etag = self.etag + '-gzip'
+
+def prerender_pages(names):
+    # Le contenu des pages est entièrement fixé par le générateur : aucun rendu par requête
+    with app.app_context():
+        return {name: RenderedPage(render_template(name).encode('utf-8')) for name in names}
+
+# Une page de questionnaire par variante mélangée : Quest.v0.html, Quest.v1.html, ...
+VARIANT_PAGES = [f'Quest.v{variant}.html' for variant in range(len(VARIANTS))]
+PAGES = prerender_pages(['Quest.html', 'Results.html'] + VARIANT_PAGES)
+
+def serve_page(name, vary='Accept-Encoding'):
+    # Réponse depuis le cache : 304 si le navigateur a déjà cette version, gzip si accepté
+    page = PAGES[name]
+    use_gzip = request.accept_encodings['gzip'] > 0
+    etag = page.gzip_etag if use_gzip else page.etag
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache', 'Vary': vary}
+    if request.if_none_match.contains(etag):
+        return app.response_class(status=304, headers=headers)
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+    return app.response_class(page.gzip_body if use_gzip else page.body, mimetype='text/html', headers=headers)
+
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+ASSET_MAX_AGE = 365 * 24 * 3600  # Un an : le nom change avec le contenu
+ASSET_ENCODINGS = [('br', '.br'), ('gzip', '.gz')]  # Variantes précompressées par ordre de préférence
+
+def load_asset_variants(static_dir):
+    # Fichiers avec empreinte listés dans static/assets.json et leurs variantes précompressées présentes
+    try:
+        with open(os.path.join(static_dir, 'assets.json'), 'r', encoding='utf-8') as file:
+            names = json.load(file).values()
+    except (OSError, ValueError):
+        return {}
+    return {
+        name: [(encoding, suffix) for encoding, suffix in ASSET_ENCODINGS
+               if os.path.exists(os.path.join(static_dir, name + suffix))]
+        for name in names
+    }
+
+ASSET_VARIANTS = load_asset_variants(STATIC_DIR)
+
+@app.route('/static/<path:filename>')
+def static_file(filename):
+    if filename not in ASSET_VARIANTS:
+        return send_from_directory(STATIC_DIR, filename)  # Images : revalidation habituelle
+
+    # Fichier avec empreinte : variante précompressée acceptée par le navigateur, mise en cache permanente
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in ASSET_VARIANTS[filename]:
+        if request.accept_encodings[encoding] > 0:
+            response = send_from_directory(STATIC_DIR, filename + suffix, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(STATIC_DIR, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+class QuestionStore:
+    # Questions du mode --lazy (banque .qbank du générateur) ouvertes en mmap :
+    # ouverture instantanée, et une page n'est que la concaténation des blobs JSON, sans décodage
+
+    def __init__(self, file_name):
+        with open(file_name, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(file.fileno())
+        magic, _, self.count, _ = QBANK_HEADER.unpack_from(self.data, 0)
+        if magic != b'QBNK':
+            raise ValueError(f"'{file_name}' n'est pas une banque de questions")
+        self.data_start = QBANK_HEADER.size + QBANK_OFFSET.size * (self.count + 1)
+        self.etag = f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+
+    def offset(self, i):
+        return QBANK_OFFSET.unpack_from(self.data, QBANK_HEADER.size + QBANK_OFFSET.size * i)[0]
+
+    def page(self, offset, limit):
+        end = min(offset + limit, self.count)
+        return b','.join(self.data[self.data_start + self.offset(i):self.data_start + self.offset(i + 1)]
+                         for i in range(offset, end))
+
+QUESTION_STORE = QuestionStore(QUESTION_STORE_FILE) if os.path.exists(QUESTION_STORE_FILE) else None
+
+@app.route('/questions')
+def questions():
+    # Page de questions du mode --lazy : /questions?offset=0&limit=5 (sans les réponses correctes)
+    if QUESTION_STORE is None:
+        return 'Ce module affiche toutes les questions dans la page.', 404
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), QUESTION_PAGE_LIMIT)
+    etag = f'{QUESTION_STORE.etag}-{offset}-{limit}'
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+    if request.if_none_match.contains(etag):
+        return app.response_class(status=304, headers=headers)
+
+    body = b'{"total":%d,"offset":%d,"questions":[%s]}' % (QUESTION_STORE.count, offset,
+                                                          QUESTION_STORE.page(offset, limit))
+    return app.response_class(body, mimetype='application/json', headers=headers)
 
 @app.route('/results')
 def results():
-    return render_template('Results.html')
+    return serve_page('Results.html')
+
+@app.route('/results/snapshot')
+def results_snapshot():
+    # Totaux et réponses reçues après la version 'since' pour les tableaux de bord qui (re)chargent la page ;
+    # l'ETag dépend de la version : une requête If-None-Match sans nouvelle réponse reçoit 304
+    return snapshot_response(app, request, results_aggregator)
 
 @app.route('/')
 def index():
-    return render_template('Quest.html')
+    # Identifiant de session : un même élève ne peut enregistrer deux fois les réponses d'un pseudo
+    if 'sid' not in session:
+        session['sid'] = secrets.token_urlsafe(12)
+    if not VARIANTS:
+        return serve_page('Quest.html')
+    # Variante tirée à la première visite et conservée dans la session : même ordre après un rechargement
+    variant = session.get('variant')
+    if not isinstance(variant, int) or not 0 <= variant < len(VARIANTS):
+        variant = session['variant'] = secrets.randbelow(len(VARIANTS))
+    return serve_page(VARIANT_PAGES[variant], vary='Accept-Encoding, Cookie')
+
+@app.route('/metrics')
+def metrics():
+    # Mesures de ce processus au format Prometheus
+    return app.response_class(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/submit', methods=['POST'])
+@timed(SUBMIT_LATENCY)
 def submit():
-    pseudo = request.form['pseudo']
-    responses = {{'pseudo': pseudo}}
-
-    for i, (question, _, _) in enumerate({quiz}): # question_0, ...
-        question_key = f'question_{{i}}'
-        response_key = f'Question {{i+1}}'
-        response = request.form[question_key]
-        responses[response_key] = response
-
-    # Obtenez l'adresse IP de l'élève
+    # Limitation par adresse IP, puis nombre borné d'envois en attente de la file d'écriture ou du courtier
     ip_address = request.remote_addr
-
-    # Exemple d'affichage des réponses soumises
-    print(f"Pseudo: {{pseudo}}")
-    for i, (question, _, _) in enumerate({quiz}):
-        response_key = f'Question {{i+1}}'
-        response = responses[response_key]
-        print(f"{{response_key}}: {{response}}")
-
-    # Enregistrez les réponses dans un fichier CSV avec l'adresse IP
-    responses['IP'] = ip_address
-    save_responses_to_csv(responses)
-
-    # Émettre l'événement 'student_response' avec les réponses à tous les clients connectés
-    emit('student_response', {{'pseudo': pseudo, 'responses': responses}}, namespace='/', broadcast=True)
+    wait = rate_limiter.acquire(ip_address)
+    if wait:
+        SUBMISSIONS_THROTTLED.inc()
+        return "Trop d'envois, veuillez réessayer.", 429, {'Retry-After': str(math.ceil(wait))}
+    if not admission.acquire(blocking=False):
+        SUBMISSIONS_REJECTED.inc()
+        return 'Serveur surchargé, veuillez réessayer.', 503, {'Retry-After': '1'}
+    try:
+        return accept_submission(ip_address)
+    finally:
+        admission.release()
+
+def accept_submission(ip_address):
+    # Enregistre une réponse admise par submit (doublons ignorés)
+    form = request.form
+    pseudo = form['pseudo']
+
+    variant = form.get('variant', type=int)
+    with quiz_lock:
+        answer_key, fields, labels = ANSWER_KEY, QUESTION_FIELDS, RESPONSE_LABELS
+        variants = VARIANT_SETS.get(form.get('variant_set', VARIANT_SET))
+
+    # Plusieurs cases cochées possibles : réponses séparées par des virgules
+    answers = [','.join(form.getlist(field)) for field in fields]
+    if variant is not None:
+        # Série inconnue (page ouverte avant un redémarrage du serveur et une reconstruction)
+        # ou nombre de questions modifié depuis : les correspondances ne s'appliquent plus
+        if variants is None or (0 <= variant < len(variants) and len(variants[variant]) != len(answers)):
+            return "Le quiz a été modifié depuis l'ouverture de la page : rechargez-la pour répondre.", 409
+        if 0 <= variant < len(variants):
+            answers = canonical_answers(variants[variant], answers)
+
+    # Réponses corrigées par le serveur ; le score est enregistré avec la réponse
+    score = score_answers(answers, answer_key)
+
+    # Doublon (double clic, nouvel envoi du formulaire) : même réponse que le premier envoi, rien n'est enregistré
+    submission = Submission(pseudo, answers, ip_address, time.time(), score)
+    key = form.get('submission_key') or request.headers.get('Idempotency-Key')
+    session_id = session.get('sid')
+    if submission_index.claim(submission, key, session_id) is not None:
+        SUBMISSIONS_DUPLICATE.inc()
+        log_event(logging.INFO, 'duplicate_submission', pseudo=pseudo, ip=ip_address)
+        return 'Réponses soumises avec succès.'
+
+    # Avec SQLite, un pseudo déjà accepté (autre session, encore en file d'écriture) ou enregistré
+    # avant un redémarrage du serveur est refusé
+    if isinstance(response_storage, SqliteStorage) and (
+            not submission_index.claim_pseudo(submission) or response_storage.has_submitted(pseudo)):
+        submission_index.release(submission, key, session_id)
+        SUBMISSIONS_DUPLICATE.inc()
+        log_event(logging.INFO, 'duplicate_submission', pseudo=pseudo, ip=ip_address)
+        return 'Ce pseudo a déjà envoyé ses réponses.', 409
+
+    # Réponses soumises au journal (niveau info, échantillonné), sans écriture synchrone sur la sortie
+    log_event(logging.INFO, 'submission', sampled=True, pseudo=pseudo, ip=ip_address, score=score,
+              answers=dict(zip(labels, answers)))
+
+    # Mettez les réponses en file d'écriture vers le stockage avec l'adresse IP
+    if CLUSTER_URL:
+        # Plusieurs processus : la réponse est appliquée par follow_submissions, dans l'ordre du courtier
+        if not submission_broker.publish('submissions', submission):
+            submission_index.release(submission, key, session_id)
+            SUBMISSIONS_REJECTED.inc()
+            return 'Serveur surchargé, veuillez réessayer.', 503, {'Retry-After': '1'}
+        SUBMISSIONS.inc()
+        draft_store.discard(form.get('draft_key'))
+        return 'Réponses soumises avec succès.'
+
+    if not response_writer.submit(submission, SUBMIT_WAIT):
+        submission_index.release(submission, key, session_id)
+        SUBMISSIONS_REJECTED.inc()
+        return 'Serveur surchargé, veuillez réessayer.', 503, {'Retry-After': '1'}
+    SUBMISSIONS.inc()
+    draft_store.discard(form.get('draft_key'))
+
+    # Mettre à jour les totaux et le classement ; la diffusion aux tableaux de bord est groupée par broadcast_results.
+    # Quiz rechargé depuis la correction : classée avec la nouvelle clé, comme les réponses recalculées par rescore
+    with quiz_lock:
+        if ANSWER_KEY is not answer_key:
+            score = score_answers(answers, ANSWER_KEY)
+        results_aggregator.add(pseudo, answers, ip_address, score)
 
     # Réponse de confirmation
     return 'Réponses soumises avec succès.'
 
+def reload_quiz():
+    # Recharge le module reconstruit sans redémarrer le serveur : clé de réponses, variantes, pages,
+    # fichiers statiques et questions --lazy sont d'abord tous chargés, puis remplacés ensemble
+    global ANSWER_KEY, QUESTION_FIELDS, RESPONSE_LABELS, VARIANT_SET, VARIANTS, VARIANT_PAGES, PAGES, ASSET_VARIANTS
+    global QUESTION_STORE
+    answer_key = load_answer_key(ANSWER_KEY_FILE)
+    variant_set, variants = load_variants(VARIANTS_FILE)
+    variant_pages = [f'Quest.v{variant}.html' for variant in range(len(variants))]
+    if app.jinja_env.cache is not None:
+        app.jinja_env.cache.clear()  # Modèles relus depuis le disque
+    pages = prerender_pages(['Quest.html', 'Results.html'] + variant_pages)
+    asset_variants = load_asset_variants(STATIC_DIR)
+    question_store = QuestionStore(QUESTION_STORE_FILE) if os.path.exists(QUESTION_STORE_FILE) else None
+
+    fields = [f'question_{i}' for i in range(len(answer_key))]
+    labels = [f'Question {i+1}' for i in range(len(answer_key))]
+
+    with quiz_lock:
+        ANSWER_KEY, QUESTION_FIELDS, RESPONSE_LABELS = answer_key, fields, labels
+        VARIANT_SET, VARIANTS, VARIANT_PAGES, PAGES = variant_set, variants, variant_pages, pages
+        VARIANT_SETS[variant_set] = variants
+        ASSET_VARIANTS, QUESTION_STORE = asset_variants, question_store
+        results_aggregator.rescore(answer_key, labels)
+
+def build_manifest_mtime():
+    try:
+        return os.stat(BUILD_MANIFEST_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+def watch_build_manifest(interval):
+    # Tâche de fond : le générateur réécrit le manifeste de construction après tous les autres fichiers ;
+    # à chaque changement, le quiz est rechargé et les tableaux de bord reçoivent un seul événement quiz_updated
+    last_mtime = build_manifest_mtime()
+    while True:
+        socketio.sleep(interval)
+        mtime = build_manifest_mtime()
+        if mtime is None or mtime == last_mtime:
+            continue
+        last_mtime = mtime
+        try:
+            reload_quiz()
+        except (OSError, ValueError, KeyError) as error:
+            log_event(logging.ERROR, 'quiz_reload_failed', error=str(error))
+            continue
+        log_event(logging.WARNING, 'quiz_updated', questions=len(ANSWER_KEY))
+        # Avec plusieurs processus, chacun recharge le module mais seul le processus 0 prévient les clients
+        if IS_LEADER:
+            socketio.emit('quiz_updated', {'questions': len(ANSWER_KEY), 'version': results_aggregator.version})
+
+if SERVER_ARGS.reload_interval > 0:
+    socketio.start_background_task(watch_build_manifest, SERVER_ARGS.reload_interval)
+"""
+
+SERVER_MAIN = """
+def run_server(args):
+    # Lance le serveur de développement (debug) ou le serveur asynchrone de production
+    if args.mode == 'dev':
+        # Sans rechargement automatique : le processus de surveillance tuerait (SIGKILL) le serveur à l'arrêt
+        # avant que la file d'écriture soit vidée. allow_unsafe_werkzeug : serveur choisi par --mode dev
+        socketio.run(app, host=args.host, port=args.port, debug=True, use_reloader=False,
+                     allow_unsafe_werkzeug=True)
+    elif ASYNC_MODE == 'eventlet':
+        # max_size : nombre de connexions traitées en parallèle ; keepalive : délai des connexions inactives
+        socketio.run(app, host=args.host, port=args.port, debug=False, use_reloader=False, log_output=False,
+                     max_size=args.max_connections, keepalive=args.keepalive)
+    else:
+        # spawn : taille du pool de greenlets, donc nombre de connexions simultanées (TCP_NODELAY : voir serve_gevent)
+        serve_gevent(app, args.host, args.port, spawn=args.max_connections)
+
 if __name__ == '__main__':
-    socketio.run(app, port=8000, debug=True)'''
+    run_server(SERVER_ARGS)"""
+
+# Fichier de la clé de réponses lue par le serveur au démarrage
+ANSWER_KEY_FILE = "answer_key.json"
+
+# Génère la clé de réponses compacte du quiz (JSON) : lettres correctes par numéro de question
+def generate_answer_key(quiz):
+    keys = [answer_key(correct_choices) for _, _, correct_choices in quiz]
+    return json.dumps({'version': 1, 'questions': len(keys), 'keys': keys}, separators=(',', ':'))
+
+# Questions précompilées du mode --lazy (banque .qbank), servies par pages par le serveur
+QUESTION_STORE_FILE = "questions.qbank"
+
+# Correspondances des variantes mélangées avec le quiz d'origine
+VARIANTS_FILE = "variants.json"
+
+# Génère le fichier des variantes : ordre des questions et des choix de chaque variante
+# et lettres des choix de chaque question du quiz d'origine
+def generate_variants_file(quiz, mappings):
+    # Correspondances des variantes et identifiant de la série (empreinte des correspondances) ;
+    # retourne (identifiant, contenu de variants.json)
+    labels = [[parse_choice(choice)[0] for choice in choices] for _, choices, _ in quiz]
+    variant_set = content_hash(json.dumps([labels, mappings], separators=(',', ':')))[:VARIANT_SET_ID_LENGTH]
+    return variant_set, json.dumps({'version': 1, 'id': variant_set, 'labels': labels, 'variants': mappings},
+                                   separators=(',', ':'))
+
+# Produit les blobs du magasin de questions du mode --lazy : texte, type et choix de chaque question,
+# sans la clé de réponses
+def iter_question_store(quiz):
+    for i, (question, choices, correct_choices) in enumerate(quiz):
+        yield json.dumps({
+            'number': i,
+            'text': question,
+            'multiple': len(correct_choices) > 1,
+            'choices': [list(parse_choice(choice)) for choice in choices],
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# Génère le code source du serveur Flask du module de quiz
+# mode : 'dev' (serveur de développement, debug) ou 'prod' (serveur asynchrone de production)
+# storage : stockage des réponses par défaut, 'csv' ou 'sqlite'
+def generate_server_script(mode='dev', storage='csv', quiz_name='quiz'):
+    return ''.join([
+        SERVER_HEADER.format(mode=mode, storage=storage, quiz_name=quiz_name, answer_key_file=ANSWER_KEY_FILE,
+                             question_store_file=QUESTION_STORE_FILE, variants_file=VARIANTS_FILE,
+                             manifest_file=MANIFEST_FILE),
+        SERVER_CLUSTER,
+        SERVER_METRICS,
+        SERVER_ANSWER_KEY,
+        SERVER_STORAGE,
+        SERVER_WRITER,
+        SERVER_RESULTS,
+        SERVER_ADMISSION,
+        SERVER_DRAFTS,
+        SERVER_APP,
+        SERVER_MAIN,
+    ])
+
+def render_quiz(title, quiz):
+    # Module de quiz rendu en mémoire, sans rien écrire (API de bibliothèque, utilisée par ETMLQuizHost.py) :
+    # pages, fichiers statiques minifiés avec empreinte ('css/styles.3f2a9c1b0d.css' -> contenu) et clé de réponses
+    sources = [('css', 'styles.css', QUIZ_STYLES),
+               ('js', 'student_form_script.js', NO_AUTOSAVE_SCRIPT + QUESTIONNAIRE_SCRIPT),
+               ('js', 'student_response_script.js', iter_student_response_script(quiz))]
+    socketio_client = load_vendor_file(SOCKETIO_CLIENT_FILE, SOCKETIO_CLIENT_URL)
+    if socketio_client:
+        sources.append(('js', SOCKETIO_CLIENT_FILE, socketio_client))
+    assets, files = {}, {}
+    for kind, file_name, content in sources:
+        data, hashed_name = hashed_asset(file_name, content)
+        assets[f"{kind}/{file_name}"] = f"{kind}/{hashed_name}"
+        files[f"{kind}/{hashed_name}"] = data
+    return {
+        'title': title,
+        'answer_key': [answer_key(correct_choices) for _, _, correct_choices in quiz],
+        'pages': {
+            'Quest.html': generate_questionnaire_html(title, quiz, assets),
+            'Results.html': generate_results_html(len(quiz), assets),
+        },
+        'assets': files,
+    }
 
-    save_static_file(server_quiz_content, 'serverQuiz.py', module_dir)
+# Enregistre le contenu HTML dans un fichier
+def save_html(html_content, file_name, manifest=None):
+    write_text_file(file_name, html_content, manifest)
+
+# Enregistre le contenu statique dans un fichier
+def save_static_file(content, file_name, folder, manifest=None):
+    write_text_file(os.path.join(folder, file_name), content, manifest)
+
+def module_dir_for(file_name, output_dir='.'):
+    # Dossier du module de quiz correspondant à un fichier .quiz
+    module_name = os.path.splitext(os.path.basename(file_name))[0]
+    return os.path.normpath(os.path.join(output_dir, f"quiz_module_{module_name}"))
+
+def read_build_manifest(module_dir):
+    # Lit le manifeste de la dernière construction du module (vide s'il n'existe pas)
+    try:
+        with open(os.path.join(module_dir, MANIFEST_FILE), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def remove_stale_artifacts(module_dir, manifest):
+    # Supprime les fichiers de la construction précédente qui ne font plus partie du module
+    # (anciennes versions des fichiers statiques avec empreinte)
+    for path in read_build_manifest(module_dir).get('artifacts', {}):
+        file_path = os.path.join(module_dir, path)
+        if path not in manifest['artifacts'] and os.path.exists(file_path):
+            os.remove(file_path)
+
+def write_build_manifest(module_dir, manifest):
+    # Enregistre le manifeste de manière atomique une fois tous les fichiers écrits
+    content = {
+        'builder': BUILDER_HASH,
+        'source': manifest['source'],
+        'artifacts': dict(sorted(manifest['artifacts'].items())),
+    }
+    manifest_path = os.path.join(module_dir, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(content, file, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    record_written(manifest, manifest_path)
+
+def quiz_source_hash(file_name, questions=None, options=None):
+    # Empreinte de la source d'un module : contenu du .quiz, sélection de questions et options de construction
+    return content_hash(file_hash(file_name) + repr(questions) + repr(sorted((options or {}).items())))
+
+def is_module_up_to_date(module_dir, source_hash):
+    # Un module est à jour si le générateur et la source n'ont pas changé
+    # et que tous les fichiers produits lors de la dernière construction existent encore
+    previous = read_build_manifest(module_dir)
+    if previous.get('builder') != BUILDER_HASH or previous.get('source') != source_hash:
+        return False
+    return all(os.path.exists(os.path.join(module_dir, path)) for path in previous.get('artifacts', {}))
+
+def find_logo_file(file_name):
+    # Cherche l'image ETML.png dans le dossier courant, à côté du quiz ou à côté du générateur
+    for folder in ('.', os.path.dirname(os.path.abspath(file_name)), os.path.dirname(os.path.abspath(__file__))):
+        path = os.path.join(folder, "ETML.png")
+        if os.path.exists(path):
+            return path
+    return None
+
+def create_quiz_module(file_name, questions=None, output_dir='.', force=False, verbose=True, mode='dev',
+                       storage='csv', lazy=False, variants=0, profile=False):
+    # Crée un module de quiz à partir d'un fichier
+    # questions : numéros (à partir de 0) des questions à retenir, None pour tout le quiz
+    # force : reconstruit tous les fichiers même si le manifeste les indique inchangés
+    # mode : mode par défaut du serveur généré, 'dev' ou 'prod'
+    # storage : stockage des réponses par défaut du serveur généré, 'csv' ou 'sqlite'
+    # lazy : questionnaire à chargement progressif (une question à la fois, chargée depuis le serveur)
+    # variants : nombre de variantes aux questions et choix mélangés (0 : ordre du fichier pour tous)
+    # profile : mesure chaque phase (durée, fichiers écrits, octets), ajoutée au résumé sous 'profile'
+    # Retourne un résumé de la construction (module, reconstruit ou non, fichiers écrits/ignorés, durée)
+    start_time = time.perf_counter()
+    build_profile = BuildProfile() if profile else None
+    module_dir = module_dir_for(file_name, output_dir)
+    with build_phase(build_profile, 'source_hash'):
+        socketio_client = load_vendor_file(SOCKETIO_CLIENT_FILE, SOCKETIO_CLIENT_URL)
+        source_hash = quiz_source_hash(file_name, questions, {
+            'mode': mode, 'storage': storage, 'lazy': lazy, 'variants': variants, 'socketio_client': socketio_client and content_hash(socketio_client),
+        })
+
+    # Module inchangé depuis la dernière construction : rien à faire
+    if not force and is_module_up_to_date(module_dir, source_hash):
+        if verbose:
+            print(f"Le module '{module_dir}' est déjà à jour.")
+        summary = {'module': module_dir, 'rebuilt': False, 'written': 0, 'skipped': 0,
+                   'duration': time.perf_counter() - start_time}
+        if build_profile:
+            summary['profile'] = build_profile.report()
+        return summary
+
+    manifest = {
+        'root': module_dir,
+        'source': source_hash,
+        'previous': {} if force else read_build_manifest(module_dir).get('artifacts', {}),
+        'artifacts': {},
+        'written': 0,
+        'skipped': 0,
+        'profile': build_profile,
+    }
+    template_dir = os.path.join(module_dir, "templates")
+    static_dir = os.path.join(module_dir, "static")
+    images_dir= os.path.join(static_dir, "images")
+    
+    # Crée les répertoires nécessaires pour le module de quiz
+    os.makedirs(template_dir, exist_ok=True)
+    os.makedirs(static_dir, exist_ok=True)
+    os.makedirs(images_dir, exist_ok=True)
 
-    print(f"Le dossier '{module_dir}' et les fichiers HTML ont été créés avec succès.")
+    # Charge le quiz à partir du fichier, ou seulement les questions demandées grâce à l'index
+    # (banque compilée : questions lues directement dans la banque)
+    with build_phase(build_profile, 'load_quiz'):
+        if file_name.endswith(QBANK_EXTENSION):
+            title, quiz = load_bank_questions(file_name, questions)
+        elif questions is None:
+            title, quiz = load_quiz(file_name)
+        else:
+            title, quiz = read_quiz_title(file_name), load_questions(file_name, questions)
+    
+    # Générateur du script de réponse des étudiants (assemblé pour calculer son empreinte)
+    student_response_script = iter_student_response_script(quiz)
+
+    # Fichiers statiques minifiés, nommés d'après leur empreinte et précompressés ;
+    # les pages les référencent via le manifeste static/assets.json
+    assets = {}
+    with build_phase(build_profile, 'static_assets'):
+        create_css_file(module_dir, "styles.css", QUIZ_STYLES, manifest, assets)
+        if lazy:
+            create_js_file(module_dir, "student_lazy_script.js", LAZY_FORM_SCRIPT, manifest, assets)
+        else:
+            create_js_file(module_dir, "student_form_script.js", FORM_SCRIPT, manifest, assets)
+        create_js_file(module_dir, "student_response_script.js", student_response_script, manifest, assets)
+        if socketio_client:
+            create_js_file(module_dir, SOCKETIO_CLIENT_FILE, socketio_client, manifest, assets)
+        save_static_file(json.dumps(assets, indent=2, sort_keys=True), ASSET_MANIFEST_FILE, static_dir, manifest)
+
+    # Générateurs des fragments du questionnaire et des résultats :
+    # ils sont écrits au fil de l'eau dans les fichiers, sans construire de grandes chaînes en mémoire
+    # (leur génération est donc mesurée avec l'écriture des pages)
+    if lazy:
+        question_html = generate_lazy_questionnaire_html(title, len(quiz), assets)
+        with build_phase(build_profile, 'question_store'):
+            write_question_bank(os.path.join(module_dir, QUESTION_STORE_FILE), iter_question_store(quiz),
+                                [(os.path.splitext(os.path.basename(file_name))[0], title, len(quiz))], manifest)
+    else:
+        question_html = iter_questionnaire_html(title, quiz, assets)
+
+    # Variantes mélangées, rendues une fois ici : le serveur sert chaque variante comme une page statique.
+    # Le mélange ne dépend que du nom du quiz et du numéro de la variante, pas du contenu : corriger le texte
+    # d'une question ne change pas les correspondances des pages déjà ouvertes par les élèves
+    quiz_name = os.path.splitext(os.path.basename(file_name))[0]
+    with build_phase(build_profile, 'variants'):
+        shuffled = [shuffle_quiz(quiz, f"{quiz_name}:{variant}") for variant in range(variants)]
+        if shuffled:
+            variant_set, variants_content = generate_variants_file(quiz, [mapping for _, mapping in shuffled])
+            for variant, (variant_quiz, _) in enumerate(shuffled):
+                save_html(iter_questionnaire_html(title, variant_quiz, assets, variant, variant_set),
+                          os.path.join(template_dir, f"Quest.v{variant}.html"), manifest)
+            save_static_file(variants_content, VARIANTS_FILE, module_dir, manifest)
+    results_html = iter_results_html(len(quiz), assets)
+
+    # Copie du logo (copié et non déplacé, pour pouvoir construire plusieurs modules)
+    with build_phase(build_profile, 'logo'):
+        logo_path = find_logo_file(file_name)
+        if logo_path:
+            copy_asset_file(logo_path, os.path.join(images_dir, "ETML.png"), manifest)
+
+    with build_phase(build_profile, 'questionnaire_html'):
+        save_html(question_html, os.path.join(template_dir, "Quest.html"), manifest)
+    with build_phase(build_profile, 'results_html'):
+        save_html(results_html, os.path.join(template_dir, "Results.html"), manifest)
+
+    # Génère le serveur serverQuiz.py et la clé de réponses qu'il charge au démarrage
+    with build_phase(build_profile, 'server_script'):
+        server_quiz_content = generate_server_script(mode, storage, quiz_name)
+        save_static_file(generate_answer_key(quiz), ANSWER_KEY_FILE, module_dir, manifest)
+
+        save_static_file(server_quiz_content, 'serverQuiz.py', module_dir, manifest)
+        copy_asset_file(RUNTIME_FILE, os.path.join(module_dir, os.path.basename(RUNTIME_FILE)), manifest)
+
+    with build_phase(build_profile, 'manifest'):
+        remove_stale_artifacts(module_dir, manifest)
+        write_build_manifest(module_dir, manifest)
+
+    if verbose:
+        print(f"Le dossier '{module_dir}' et les fichiers HTML ont été créés avec succès.")
+
+    summary = {'module': module_dir, 'rebuilt': True, 'written': manifest['written'],
+               'skipped': manifest['skipped'], 'duration': time.perf_counter() - start_time}
+    if build_profile:
+        summary['profile'] = build_profile.report()
+    return summary
+
+def _build_module_job(job):
+    # Tâche exécutée dans un processus de la construction par lots
+    file_name, options = job
+    return create_quiz_module(file_name, verbose=False, **options)
+
+def build_quiz_modules(source_dir, output_dir='.', jobs=None, force=False, mode='dev', storage='csv',
+                       lazy=False, variants=0, profile=False):
+    # Construit en parallèle les modules de tous les fichiers .quiz d'un dossier
+    # Les modules et fichiers inchangés (d'après leur manifeste) sont ignorés
+    start_time = time.perf_counter()
+    quiz_files = sorted(
+        os.path.join(source_dir, name) for name in os.listdir(source_dir) if name.endswith('.quiz')
+    )
+    options = {'output_dir': output_dir, 'force': force, 'mode': mode, 'storage': storage, 'lazy': lazy,
+               'variants': variants, 'profile': profile}
+    load_vendor_file(SOCKETIO_CLIENT_FILE, SOCKETIO_CLIENT_URL)  # Un seul téléchargement pour tous les processus
+    job_list = [(file_name, options) for file_name in quiz_files]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(_build_module_job, job_list))
+
+    for result in results:
+        state = "reconstruit" if result['rebuilt'] else "inchangé"
+        print(f"{result['module']} : {state} ({result['written']} fichiers écrits, "
+              f"{result['skipped']} ignorés, {result['duration'] * 1000:.1f} ms)")
+
+    rebuilt = sum(1 for result in results if result['rebuilt'])
+    print(f"{rebuilt} module(s) reconstruit(s), {len(results) - rebuilt} ignoré(s) "
+          f"en {time.perf_counter() - start_time:.2f} s.")
+
+    return results
+
+# Version du format du rapport --profile
+PROFILE_REPORT_VERSION = 1
+
+def write_profile_report(file_name, results, duration):
+    # Rapport JSON de la construction (--profile) : une entrée par module avec ses phases,
+    # pour suivre les performances de construction d'une version à l'autre ; '-' : sortie standard
+    report = {
+        'version': PROFILE_REPORT_VERSION,
+        'builder': BUILDER_HASH,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'duration': duration,
+        'modules': results,
+    }
+    content = json.dumps(report, indent=2, ensure_ascii=False)
+    if file_name == '-':
+        print(content)
+        return
+    write_text_file(file_name, content + '\n')
+    print(f"Rapport de construction : '{file_name}' ({len(results)} module(s), {duration:.2f} s).")
+
+# Intervalle de surveillance des fichiers .quiz par --watch (secondes)
+WATCH_INTERVAL = 1.0
+
+def diff_quizzes(old_quiz, new_quiz):
+    # Questions modifiées et ajoutées (numéros à partir de 0 dans la nouvelle version) et supprimées (numéros
+    # dans l'ancienne) entre deux versions d'un quiz. Les questions sont associées par leur texte : insérer
+    # une question ne signale pas les suivantes comme modifiées. Un texte remplacé sur place compte comme
+    # une question modifiée
+    matcher = difflib.SequenceMatcher(None, [question for question, _, _ in old_quiz],
+                                      [question for question, _, _ in new_quiz], autojunk=False)
+    changed, added, removed = [], [], []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            changed.extend(new_start + k for k in range(new_end - new_start)
+                           if old_quiz[old_start + k] != new_quiz[new_start + k])
+        else:
+            paired = min(old_end - old_start, new_end - new_start)
+            changed.extend(range(new_start, new_start + paired))
+            added.extend(range(new_start + paired, new_end))
+            removed.extend(range(old_start + paired, old_end))
+    return changed, added, removed
+
+def watch_quiz_files(quiz_files, build, interval=WATCH_INTERVAL):
+    # Surveille les fichiers .quiz et reconstruit le module de ceux dont les questions ont changé
+    # (build(file_name) ; seuls les fichiers modifiés du module sont réécrits, voir le manifeste).
+    # Un serveur lancé depuis le module recharge le quiz à chaud. Ctrl+C pour arrêter
+    states = {}
+    for file_name in quiz_files:
+        states[file_name] = (os.stat(file_name).st_mtime_ns, load_quiz(file_name))
+    print(f"Surveillance de {len(states)} fichier(s) .quiz (Ctrl+C pour arrêter)...")
+    try:
+        while True:
+            time.sleep(interval)
+            for file_name, (last_mtime, (old_title, old_quiz)) in list(states.items()):
+                try:
+                    mtime = os.stat(file_name).st_mtime_ns
+                    if mtime == last_mtime:
+                        continue
+                    title, quiz = load_quiz(file_name)
+                except (OSError, ValueError) as error:
+                    print(f"{file_name} : lecture impossible ({error})")
+                    continue
+                states[file_name] = (mtime, (title, quiz))
+
+                changed, added, removed = diff_quizzes(old_quiz, quiz)
+                if title == old_title and not (changed or added or removed):
+                    print(f"{file_name} : enregistré sans modification des questions")
+                    continue
+                details = [f"{len(changed)} modifiée(s)", f"{len(added)} ajoutée(s)", f"{len(removed)} supprimée(s)"]
+                if changed:
+                    details[0] += ' (' + ', '.join(str(i + 1) for i in changed[:10]) + (', ...' if len(changed) > 10 else '') + ')'
+                if title != old_title:
+                    details.append("titre modifié")
+                print(f"{file_name} : questions {', '.join(details)}")
+                build(file_name)
+    except KeyboardInterrupt:
+        pass
 
 def read_file_content(file_name):
     # Lit le contenu d'un fichier et le retourne
@@ -659,10 +3185,105 @@ def read_file_content(file_name):
         content = file.read()  # Lecture du contenu du fichier
     return content  # Retourne le contenu du fichier
 
-def main():
+def parse_arguments(argv=None):
+    # Options de la ligne de commande ; sans argument, le programme reste interactif
+    parser = argparse.ArgumentParser(description="Crée des modules de quiz Flask à partir de fichiers .quiz")
+    parser.add_argument("quiz_file", nargs="*",
+                        help="fichier .quiz (ou banque .qbank) à transformer en module ; fichiers et dossiers pour --compile")
+    parser.add_argument("--batch", metavar="DOSSIER", help="construit tous les fichiers .quiz du dossier")
+    parser.add_argument("--output", default=".", help="dossier de destination des modules (défaut : .)")
+    parser.add_argument("--jobs", type=int, default=None, help="nombre de processus pour --batch")
+    parser.add_argument("--force", action="store_true", help="reconstruit même les fichiers inchangés")
+    parser.add_argument("--mode", choices=["dev", "prod"], default="dev",
+                        help="serveur généré : développement (debug) ou production asynchrone (eventlet/gevent)")
+    parser.add_argument("--storage", choices=["csv", "sqlite"], default="csv",
+                        help="stockage des réponses du serveur généré : responses.csv ou base SQLite (WAL)")
+    parser.add_argument("--lazy", action="store_true",
+                        help="questionnaire à chargement progressif : une question à la fois, chargée depuis le serveur")
+    parser.add_argument("--variants", type=int, default=0, metavar="K",
+                        help="génère K variantes aux questions et choix mélangés, attribuées par session")
+    parser.add_argument("--compile", metavar="BANQUE", help="compile les fichiers .quiz donnés en une banque .qbank")
+    parser.add_argument("--sample", type=int, metavar="N", help="module de N questions tirées au hasard dans la banque")
+    parser.add_argument("--tags", help="thèmes (noms des fichiers .quiz compilés) autorisés pour --sample, séparés par des virgules")
+    parser.add_argument("--stratify", action="store_true", help="--sample proportionnel à la taille de chaque thème")
+    parser.add_argument("--seed", help="graine du tirage --sample (tirage reproductible)")
+    parser.add_argument("--profile", metavar="RAPPORT",
+                        help="mesure chaque phase de la construction et écrit un rapport JSON ('-' : sortie standard)")
+    parser.add_argument("--watch", action="store_true",
+                        help="surveille les fichiers .quiz et reconstruit les modules à chaque modification")
+    parser.add_argument("--pstats", metavar="FICHIER",
+                        help="enregistre le profil cProfile de la construction (lisible avec pstats ou snakeviz)")
+    args = parser.parse_args(argv)
+    if args.variants and args.lazy:
+        parser.error("--variants ne s'applique pas au questionnaire --lazy")
+    if len(args.quiz_file) > 1 and not args.compile:
+        parser.error("plusieurs fichiers ne sont acceptés qu'avec --compile")
+    if args.sample is not None and not (args.quiz_file and args.quiz_file[0].endswith(QBANK_EXTENSION)):
+        parser.error("--sample nécessite une banque .qbank (voir --compile)")
+    if args.sample is not None and args.sample < 0:
+        parser.error("--sample doit être positif ou nul")
+    if args.sample is not None:
+        # Taille du tirage vérifiée sur la banque (en-tête seulement) avant toute construction
+        try:
+            with QuestionBank(args.quiz_file[0]) as bank:
+                available = sum(end - start for start, end in bank.tag_ranges(args.tags and args.tags.split(',')))
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+        if args.sample > available:
+            parser.error(f"--sample {args.sample} : la banque ne contient que {available} question(s)"
+                         + (" pour ces thèmes" if args.tags else ""))
+    if args.watch and (args.compile or args.sample is not None or not (args.batch or args.quiz_file)
+                       or any(name.endswith(QBANK_EXTENSION) for name in args.quiz_file)):
+        parser.error("--watch nécessite un fichier .quiz ou --batch")
+    return args
+
+def run_command(args):
+    # Exécute la commande demandée ; retourne les résumés des modules construits
+    profile = bool(args.profile)
+    if args.batch:
+        return build_quiz_modules(args.batch, args.output, args.jobs, args.force, args.mode, args.storage,
+                                  args.lazy, args.variants, profile)  # Construction par lots
+
+    if args.compile:
+        bank_file, tags = compile_question_bank(args.quiz_file, args.compile)  # Compilation d'une banque
+        print(f"Banque '{bank_file}' : {sum(count for _, _, count in tags)} questions, {len(tags)} thème(s).")
+        return []
+
+    questions = None
+    file_name = args.quiz_file[0] if args.quiz_file else input("Entrez le nom du fichier .quiz : ")  # Demande le nom du fichier .quiz si absent
+    if args.sample is not None:
+        # Examen tiré au hasard dans la banque, sans la charger entièrement
+        with QuestionBank(file_name) as bank:
+            questions = sample_questions(bank, args.sample, args.tags and args.tags.split(','), args.stratify, args.seed)
+    return [create_quiz_module(file_name, questions, output_dir=args.output, force=args.force, mode=args.mode,
+                               storage=args.storage, lazy=args.lazy, variants=args.variants,
+                               profile=profile)]  # Crée un module de quiz à partir du fichier spécifié
+
+def main(argv=None):
     # Fonction principale pour exécuter le programme
-    file_name = input("Entrez le nom du fichier .quiz : ")  # Demande à l'utilisateur d'entrer le nom du fichier .quiz
-    create_quiz_module(file_name)  # Crée un module de quiz à partir du fichier spécifié
+    args = parse_arguments(argv)
+
+    # --pstats : profil cProfile du processus principal ; avec --batch, les modules sont construits
+    # dans d'autres processus et n'y figurent pas (--profile mesure alors leurs phases)
+    profiler = cProfile.Profile() if args.pstats else None
+    start_time = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        results = run_command(args)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.pstats)
+    if args.profile:
+        write_profile_report(args.profile, results, time.perf_counter() - start_time)
+
+    if args.watch:
+        # Reconstructions suivantes : seuls les fichiers modifiés sont réécrits
+        options = {'output_dir': args.output, 'mode': args.mode, 'storage': args.storage, 'lazy': args.lazy,
+                   'variants': args.variants}
+        watch_quiz_files(list(_quiz_sources([args.batch] if args.batch else args.quiz_file)),
+                         lambda file_name: create_quiz_module(file_name, **options))
 
 # Début du programme principal
 if __name__ == '__main__':
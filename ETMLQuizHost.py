@@ -0,0 +1,370 @@
+#########################################################################################
+#                                 ETMLQuizHost                                          #
+#########################################################################################
+# Description :                                                                         #
+# Serveur unique pour plusieurs quiz : chaque fichier .quiz du dossier est servi sous   #
+# /q/<nom>/ (questionnaire) et /q/<nom>/results (tableau de bord), sans module ni port  #
+# par quiz. Les pages sont rendues en mémoire par ETMLQuizBuilder.render_quiz et        #
+# gardées dans un cache LRU de taille bornée ; chaque quiz a son salon Socket.IO.       #
+# Les réponses sont enregistrées dans <données>/<nom>/responses.csv ; stockage,         #
+# écriture et résultats viennent d'ETMLQuizRuntime, comme pour serverQuiz.py.           #
+#                                                                                       #
+# Utilisation : python ETMLQuizHost.py quiz/ --port 8000                                #
+# Nécessite Flask et Flask-SocketIO : pip install flask flask-socketio                  #
+#########################################################################################
+
+# Importation des modules nécessaires
+import argparse  # Module pour les options de la ligne de commande
+import os  # Module pour interagir avec le système d'exploitation
+
+# Code commun aux serveurs de quiz : bibliothèque standard seulement, importable avant le monkey patching
+from ETMLQuizRuntime import (CsvStorage, ResponseWriter, ResultsAggregator, Submission, SubmissionIndex, TokenBucket,
+                             score_answers, select_async_mode, serve_gevent, snapshot_response)
+
+def parse_host_arguments(argv=None):
+    # Options de lancement, lues avant tout import de Flask (monkey patching du mode prod)
+    parser = argparse.ArgumentParser(description="Serveur de plusieurs quiz, servis sous /q/<nom>/")
+    parser.add_argument('quiz_dir', help="dossier des fichiers .quiz à servir")
+    parser.add_argument('--host', default='127.0.0.1', help="adresse d'écoute (0.0.0.0 pour le réseau local)")
+    parser.add_argument('--port', type=int, default=8000, help="port d'écoute (défaut : 8000)")
+    parser.add_argument('--mode', choices=['dev', 'prod'], default='dev', help="serveur de développement ou de production")
+    parser.add_argument('--data', default='host_data',
+                        help="dossier des réponses, un sous-dossier par quiz (défaut : host_data)")
+    parser.add_argument('--cache-mb', type=float, default=64,
+                        help="taille maximale des quiz rendus gardés en mémoire, en Mo (défaut : 64)")
+    parser.add_argument('--max-results', type=int, default=50,
+                        help="quiz dont les résultats sont gardés en mémoire (défaut : 50)")
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    ARGS = parse_host_arguments()
+    ASYNC_MODE = select_async_mode(ARGS.mode)
+
+from collections import OrderedDict  # Cache LRU des quiz rendus
+import gzip  # Module pour la compression des pages
+import hashlib  # Module pour les ETag des pages
+import math  # Délai Retry-After arrondi
+import re  # Module pour la validation des noms de quiz
+import secrets  # Identifiants de session
+import signal  # Arrêt propre sur SIGTERM
+import sys  # Module pour la sortie du programme sur SIGTERM
+import threading  # Verrous des caches
+import time  # Module pour l'horodatage
+
+from flask import Flask, abort, redirect, request, send_file, session
+from flask_socketio import SocketIO, join_room
+
+from ETMLQuizBuilder import find_logo_file, load_quiz, read_quiz_title, render_quiz
+
+# Nom d'un quiz dans les URL : nom du fichier .quiz sans extension
+SLUG_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]*$')
+PAGE_PATTERN = re.compile(r'^/q/([^/]+)/')  # Page d'un quiz, transmise par le client Socket.IO
+
+# Diffusion des résultats : une mise à jour groupée par quiz au plus par intervalle (s)
+BROADCAST_INTERVAL = 0.25
+# Écriture des réponses (tous les quiz) : réponses en attente au maximum, taille des lots, attente maximale
+# pour grouper un lot (s), délai entre deux fsync (s) ; responses.csv fermé après STORAGE_IDLE_TIMEOUT s sans réponse
+WRITER_QUEUE_SIZE = 10000
+WRITER_BATCH_SIZE = 500
+WRITER_FLUSH_INTERVAL = 0.05
+WRITER_FSYNC_INTERVAL = 1.0
+STORAGE_IDLE_TIMEOUT = 60
+LEADERBOARD_SIZE = 10  # Places du classement de chaque quiz
+# Limitation des envois par adresse IP, comme serverQuiz.py : envois par seconde (0 = sans limite) et rafale
+SUBMIT_RATE = float(os.environ.get('QUIZ_SUBMIT_RATE', '0'))
+SUBMIT_BURST = float(os.environ.get('QUIZ_SUBMIT_BURST', '200'))
+# Envois traités en même temps au maximum (tous les quiz), au-delà : 503, comme serverQuiz.py
+SUBMIT_MAX_PENDING = int(os.environ.get('QUIZ_SUBMIT_MAX_PENDING', '64'))
+
+# Définition des classes et fonctions
+class CachedBody:
+    # Contenu servi tel quel (page ou fichier statique) avec sa version gzip et son ETag
+    def __init__(self, data):
+        self.data = data
+        self.gzip_data = gzip.compress(data, compresslevel=6, mtime=0)
+        self.etag = hashlib.sha256(data).hexdigest()[:20]
+        self.size = len(data) + len(self.gzip_data)
+
+class HostedQuiz:
+    # Quiz rendu en mémoire : pages, fichiers statiques et clé de réponses
+    def __init__(self, slug, file_name, mtime):
+        rendered = render_quiz(*load_quiz(file_name))
+        self.slug = slug
+        self.mtime = mtime
+        self.title = rendered['title']
+        self.answer_key = rendered['answer_key']
+        self.fields = [f'question_{i}' for i in range(len(self.answer_key))]
+        self.labels = [f'Question {i+1}' for i in range(len(self.answer_key))]
+        self.pages = {name: CachedBody(html.encode('utf-8')) for name, html in rendered['pages'].items()}
+        self.assets = {name: CachedBody(data) for name, data in rendered['assets'].items()}
+        self.size = sum(body.size for body in (*self.pages.values(), *self.assets.values()))
+
+class QuizCache:
+    # Quiz rendus gardés en mémoire dans la limite de max_bytes : le moins récemment utilisé est retiré
+    # en premier (LRU) et rendu de nouveau à sa prochaine demande. Un fichier .quiz modifié est rendu à nouveau
+    def __init__(self, quiz_dir, max_bytes):
+        self.quiz_dir = quiz_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # nom -> HostedQuiz, du moins au plus récemment utilisé
+        self.size = 0
+        self.asset_owners = {}  # fichier statique avec empreinte -> nom d'un quiz qui le fournit
+
+    def quiz_file(self, slug):
+        return os.path.join(self.quiz_dir, slug + '.quiz')
+
+    def slugs(self):
+        return sorted(name[:-5] for name in os.listdir(self.quiz_dir)
+                      if name.endswith('.quiz') and SLUG_PATTERN.match(name[:-5]))
+
+    def get(self, slug):
+        # Quiz demandé, rendu si nécessaire ; None s'il n'existe pas
+        if not SLUG_PATTERN.match(slug):
+            return None
+        try:
+            mtime = os.stat(self.quiz_file(slug)).st_mtime_ns
+        except OSError:
+            return None
+        with self.lock:
+            entry = self.entries.get(slug)
+            if entry and entry.mtime == mtime:
+                self.entries.move_to_end(slug)
+                return entry
+
+        # Rendu hors du verrou : les autres quiz restent servis pendant ce temps
+        entry = HostedQuiz(slug, self.quiz_file(slug), mtime)
+        with self.lock:
+            previous = self.entries.pop(slug, None)
+            if previous:
+                self.size -= previous.size
+            self.entries[slug] = entry
+            self.size += entry.size
+            self.asset_owners.update(dict.fromkeys(entry.assets, slug))
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.size
+        return entry
+
+    def asset(self, name):
+        # Fichier statique avec empreinte, retrouvé par le quiz qui le fournit (rendu de nouveau s'il a été retiré)
+        slug = self.asset_owners.get(name)
+        entry = self.get(slug) if slug else None
+        return entry and entry.assets.get(name)
+
+class ResultsCache:
+    # Résultats des quiz ayant reçu des réponses ou ouverts sur un tableau de bord, au plus max_entries :
+    # le quiz le moins récemment utilisé est retiré (LRU), puis rechargé depuis son responses.csv à la demande.
+    # Un quiz dont des réponses ne sont pas encore écrites ou diffusées n'est jamais retiré
+    def __init__(self, data_dir, writer, max_entries):
+        self.data_dir = data_dir
+        self.writer = writer
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # nom -> ResultsAggregator, du moins au plus récemment utilisé
+        self.storages = {}  # nom -> CsvStorage, gardé tant que le serveur tourne (partagé avec le thread d'écriture)
+        self.indexes = {}  # nom -> SubmissionIndex (doublons), conservé même si les résultats sont retirés
+
+    def csv_file(self, slug):
+        return os.path.join(self.data_dir, slug, 'responses.csv')
+
+    def _storage(self, quiz):
+        storage = self.storages.get(quiz.slug)
+        if storage is None:
+            storage = self.storages[quiz.slug] = CsvStorage(self.csv_file(quiz.slug), len(quiz.answer_key))
+        storage.question_count = len(quiz.answer_key)
+        return storage
+
+    def _get(self, quiz):
+        # Résultats du quiz, rechargés depuis son fichier de réponses s'ils ne sont pas en mémoire (appelé avec self.lock)
+        results = self.entries.get(quiz.slug)
+        if results is None:
+            results = ResultsAggregator(quiz.answer_key, quiz.labels, leaderboard_size=LEADERBOARD_SIZE)
+            self.entries[quiz.slug] = results.load(self._storage(quiz))
+        else:
+            self.entries.move_to_end(quiz.slug)
+        self._evict()
+        if results.answer_key != quiz.answer_key or results.labels != quiz.labels:
+            results.rescore(quiz.answer_key, quiz.labels)
+        return results
+
+    def _evict(self):
+        # Retire les quiz en trop, sauf le plus récemment utilisé ; ceux qui ne peuvent pas encore l'être
+        # le seront lors d'un prochain accès
+        for slug in list(self.entries)[:-1]:
+            if len(self.entries) <= self.max_entries:
+                return
+            results = self.entries[slug]
+            if results.broadcasted == results.version and not self.writer.pending_count(self.storages[slug]):
+                del self.entries[slug]
+
+    def get(self, quiz):
+        with self.lock:
+            return self._get(quiz)
+
+    def index(self, slug):
+        with self.lock:
+            index = self.indexes.get(slug)
+            if index is None:
+                index = self.indexes[slug] = SubmissionIndex()
+            return index
+
+    def record(self, quiz, submission):
+        # Met la réponse en file d'écriture et l'ajoute aux résultats, sous le verrou pour que ceux-ci
+        # ne soient pas retirés entre-temps ; False si la file d'écriture est pleine
+        with self.lock:
+            results = self._get(quiz)
+            if not self.writer.submit(submission, storage=self._storage(quiz)):
+                return False
+            results.add(submission.pseudo, submission.answers, submission.ip, submission.score)
+        return True
+
+    def active(self):
+        with self.lock:
+            return list(self.entries.items())
+
+def create_host(quiz_dir, data_dir='host_data', cache_bytes=64 << 20, async_mode='threading', max_results=50):
+    # Application Flask et Socket.IO servant tous les quiz du dossier
+    app = Flask(__name__, static_folder=None)
+    app.config['SECRET_KEY'] = 'secret_key'
+    socketio = SocketIO(app, async_mode=async_mode)
+    cache = QuizCache(quiz_dir, cache_bytes)
+    writer = ResponseWriter(None, WRITER_QUEUE_SIZE, WRITER_BATCH_SIZE, WRITER_FLUSH_INTERVAL, WRITER_FSYNC_INTERVAL,
+                            idle_timeout=STORAGE_IDLE_TIMEOUT).start()
+    results = ResultsCache(data_dir, writer, max_results)
+    rate_limiter = TokenBucket(SUBMIT_RATE, SUBMIT_BURST)
+    admission = threading.BoundedSemaphore(SUBMIT_MAX_PENDING)
+    logo_path = find_logo_file(os.path.join(quiz_dir, 'quiz'))
+
+    def quiz_or_404(slug):
+        quiz = cache.get(slug)
+        if quiz is None:
+            abort(404)
+        return quiz
+
+    def send_body(body, mimetype, cache_control='no-cache'):
+        # Réponse depuis le cache : 304 si le navigateur a déjà cette version, gzip si accepté
+        use_gzip = request.accept_encodings['gzip'] > 0
+        etag = body.etag + ('-gzip' if use_gzip else '')
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+        if request.if_none_match.contains(etag):
+            return app.response_class(status=304, headers=headers)
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+        return app.response_class(body.gzip_data if use_gzip else body.data, mimetype=mimetype, headers=headers)
+
+    @app.route('/')
+    def index():
+        # Liste des quiz servis
+        links = ''.join(f'<li><a href="/q/{slug}/">{slug}</a> (<a href="/q/{slug}/results">résultats</a>)</li>'
+                        for slug in cache.slugs())
+        return f'<!DOCTYPE html><html><head><title>Quiz</title></head><body><h1>Quiz</h1><ul>{links}</ul></body></html>'
+
+    @app.route('/q/<slug>')
+    def quiz_root(slug):
+        # Les pages utilisent des URL relatives : le questionnaire est servi sous /q/<nom>/
+        return redirect(f'/q/{slug}/', code=301)
+
+    @app.route('/q/<slug>/')
+    def questionnaire(slug):
+        # Identifiant de session : un même élève ne peut enregistrer deux fois les réponses d'un pseudo
+        quiz = quiz_or_404(slug)
+        if 'sid' not in session:
+            session['sid'] = secrets.token_urlsafe(12)
+        return send_body(quiz.pages['Quest.html'], 'text/html')
+
+    @app.route('/q/<slug>/results')
+    def results_page(slug):
+        return send_body(quiz_or_404(slug).pages['Results.html'], 'text/html')
+
+    @app.route('/q/<slug>/results/snapshot')
+    def results_snapshot(slug):
+        # Même réponse que /results/snapshot de serverQuiz.py (ETag, 304 sans nouvelle réponse)
+        return snapshot_response(app, request, results.get(quiz_or_404(slug)))
+
+    @app.route('/q/<slug>/submit', methods=['POST'])
+    def submit(slug):
+        # Mêmes protections que serverQuiz.py : limitation par adresse IP, nombre borné d'envois traités
+        # en même temps, puis doublons (clé de soumission ou en-tête Idempotency-Key, même pseudo dans la même
+        # session) confirmés sans seconde ligne
+        quiz = quiz_or_404(slug)
+        ip_address = request.remote_addr
+        wait = rate_limiter.acquire(ip_address)
+        if wait:
+            return "Trop d'envois, veuillez réessayer.", 429, {'Retry-After': str(math.ceil(wait))}
+        if not admission.acquire(blocking=False):
+            return 'Serveur surchargé, veuillez réessayer.', 503, {'Retry-After': '1'}
+        try:
+            return accept_submission(slug, quiz, ip_address)
+        finally:
+            admission.release()
+
+    def accept_submission(slug, quiz, ip_address):
+        form = request.form
+        pseudo = form.get('pseudo', '')
+        answers = [','.join(form.getlist(field)) for field in quiz.fields]
+        submission = Submission(pseudo, answers, ip_address, time.time(), score_answers(answers, quiz.answer_key))
+        key = form.get('submission_key') or request.headers.get('Idempotency-Key')
+        session_id = session.get('sid')
+        index = results.index(slug)
+        if index.claim(submission, key, session_id) is not None:
+            return 'Réponses soumises avec succès.'
+        if not results.record(quiz, submission):
+            index.release(submission, key, session_id)
+            return 'Serveur surchargé, veuillez réessayer.', 503, {'Retry-After': '1'}
+        return 'Réponses soumises avec succès.'
+
+    @app.route('/static/<path:filename>')
+    def static_file(filename):
+        # Fichiers avec empreinte : contenu immuable, gardé indéfiniment par le navigateur
+        if filename == 'images/ETML.png' and logo_path:
+            return send_file(logo_path, max_age=3600)
+        body = cache.asset(filename)
+        if body is None:
+            abort(404)
+        mimetype = 'text/css' if filename.endswith('.css') else 'application/javascript'
+        return send_body(body, mimetype, 'public, max-age=31536000, immutable')
+
+    @socketio.on('connect')
+    def client_connected(auth=None):
+        # Tableau de bord : salon du quiz de la page (/q/<nom>/results), seul destinataire de ses mises à jour
+        match = PAGE_PATTERN.match(request.args.get('page', ''))
+        if match:
+            join_room(match.group(1))
+
+    def broadcast_results():
+        # Tâche de fond : au plus une mise à jour groupée par quiz et par intervalle, envoyée à son seul salon
+        while True:
+            socketio.sleep(BROADCAST_INTERVAL)
+            for slug, quiz_results in results.active():
+                delta = quiz_results.take_delta()
+                if delta:
+                    socketio.emit('results_delta', delta, to=slug)
+
+    socketio.start_background_task(broadcast_results)
+    app.extensions['quiz_cache'] = cache
+    app.extensions['response_writer'] = writer
+    app.extensions['quiz_results'] = results
+    return app, socketio
+
+def main():
+    if not os.path.isdir(ARGS.quiz_dir):
+        raise SystemExit(f"Dossier introuvable : {ARGS.quiz_dir}")
+    app, socketio = create_host(ARGS.quiz_dir, ARGS.data, int(ARGS.cache_mb * (1 << 20)), ASYNC_MODE, ARGS.max_results)
+    for slug in app.extensions['quiz_cache'].slugs():
+        title = read_quiz_title(os.path.join(ARGS.quiz_dir, slug + '.quiz'))
+        print(f"http://{ARGS.host}:{ARGS.port}/q/{slug}/ : {title}")
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if ARGS.mode == 'dev':
+            socketio.run(app, host=ARGS.host, port=ARGS.port, debug=True, use_reloader=False,
+                         allow_unsafe_werkzeug=True)
+        elif ASYNC_MODE == 'gevent':
+            serve_gevent(app, ARGS.host, ARGS.port)
+        else:
+            socketio.run(app, host=ARGS.host, port=ARGS.port, debug=False, use_reloader=False, log_output=False)
+    finally:
+        app.extensions['response_writer'].close()  # Réponses en attente écrites avant de quitter
+
+# Début du programme principal
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,682 @@
+#########################################################################################
+#                                 ETMLQuizRuntime                                       #
+#########################################################################################
+# Description :                                                                         #
+# Code commun aux serveurs de quiz : serverQuiz.py (module généré, qui en reçoit une    #
+# copie) et ETMLQuizHost.py (plusieurs quiz). Stockage et écriture des réponses par     #
+# lots, correction et totaux des résultats, classement, limitation des envois et        #
+# détection des doublons.                                                               #
+#                                                                                       #
+# Ce module n'importe que la bibliothèque standard et ne crée ni verrou ni thread à     #
+# l'import : il peut être importé avant le monkey patching de gevent ou eventlet.       #
+#########################################################################################
+
+# Importation des modules nécessaires
+from collections import OrderedDict, namedtuple  # Index des doublons (ordre d'arrivée), réponse stockée
+import csv  # Module pour l'écriture de responses.csv
+import heapq  # Classement des meilleurs scores
+import json  # Réponses enregistrées dans la base SQLite
+import logging  # Erreurs d'écriture du stockage
+import os  # Module pour interagir avec le système d'exploitation
+import queue  # File d'écriture des réponses
+import secrets  # Identifiant de l'instance dans les ETag
+import socket  # Option TCP_NODELAY du serveur gevent
+import sqlite3  # Stockage SQLite (WAL)
+import threading  # Verrous et thread d'écriture
+import time  # Module pour l'horodatage
+
+# Réponse d'un étudiant telle qu'elle est stockée
+Submission = namedtuple('Submission', ['pseudo', 'answers', 'ip', 'submitted_at', 'score'])
+
+def select_async_mode(mode, async_mode=None):
+    # Mode prod : active gevent ou eventlet (async_mode, sinon le premier disponible) avant l'import de Flask ;
+    # mode dev : threads classiques
+    if mode == 'dev':
+        return 'threading'
+    for candidate in [async_mode] if async_mode else ['gevent', 'eventlet']:
+        try:
+            if candidate == 'eventlet':
+                import eventlet
+                eventlet.monkey_patch()
+            else:
+                from gevent import monkey
+                monkey.patch_all()
+            return candidate
+        except ImportError:
+            continue
+    raise SystemExit("Le mode prod nécessite gevent ou eventlet : pip install gevent")
+
+def serve_gevent(app, host, port, spawn='default'):
+    # Serveur gevent de production, construit comme par socketio.run, avec TCP_NODELAY sur chaque connexion
+    # acceptée : pywsgi envoie les en-têtes et le corps séparément, et sans cette option l'algorithme de Nagle
+    # attend l'ACK retardé du client (~40 ms) à chaque requête d'une connexion keep-alive
+    from gevent import pywsgi
+    try:
+        from geventwebsocket.handler import WebSocketHandler
+        options = {'handler_class': WebSocketHandler}
+    except ImportError:
+        options = {}  # WebSocket assuré par simple-websocket
+
+    class NoDelayServer(pywsgi.WSGIServer):
+        def handle(self, sock, address):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            super().handle(sock, address)
+
+    NoDelayServer((host, port), app, log=None, spawn=spawn, **options).serve_forever()
+
+def score_answers(answers, answer_key):
+    # Score d'une réponse : nombre de questions dont la réponse est exactement celle de la clé
+    return sum(answer == key for answer, key in zip(answers, answer_key))
+
+def csv_header(question_count):
+    # En-tête de responses.csv : toutes les lignes qui le suivent ont la disposition pseudo, réponses..., IP, score
+    return ['pseudo', *[f'Question {i + 1}' for i in range(question_count)], 'IP', 'score']
+
+def is_csv_header(row):
+    return len(row) >= 3 and row[0] == 'pseudo' and row[-2:] == ['IP', 'score']
+
+class CsvStorage:
+    # Stockage historique : une ligne par réponse dans responses.csv (pseudo, réponses..., IP, score).
+    # Un fichier créé par ce stockage commence par un en-tête (csv_header) : chaque ligne est alors lue depuis
+    # la fin (score, puis IP), quel que soit le nombre de questions au moment de son écriture. Les fichiers sans
+    # en-tête (versions précédentes) sont lus d'après le nombre de colonnes, avec ou sans score.
+
+    def __init__(self, file_name, question_count):
+        self.file_name = file_name
+        self.question_count = question_count
+        self.file = None
+
+    def open(self):
+        # Appelé par le thread d'écriture ; en-tête écrit à la création du fichier
+        os.makedirs(os.path.dirname(os.path.abspath(self.file_name)), exist_ok=True)
+        self.file = open(self.file_name, 'a', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        if not os.fstat(self.file.fileno()).st_size:
+            self.writer.writerow(csv_header(self.question_count))
+            self.file.flush()
+
+    def write_batch(self, submissions):
+        size = os.fstat(self.file.fileno()).st_size
+        try:
+            self.writer.writerows([submission.pseudo, *submission.answers, submission.ip, submission.score]
+                                  for submission in submissions)
+            self.file.flush()
+        except OSError:
+            # Lot incomplet (disque plein...) retiré du fichier : il sera réécrit en entier au prochain essai,
+            # après réouverture du fichier
+            file, self.file = self.file, None
+            try:
+                file.close()
+            except OSError:
+                pass
+            os.truncate(self.file_name, size)
+            raise
+
+    def sync(self):
+        if self.file:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def iter_submissions(self):
+        # Réponses déjà enregistrées, dans l'ordre d'arrivée
+        if not os.path.exists(self.file_name):
+            return
+        with open(self.file_name, 'r', newline='', encoding='utf-8') as csvfile:
+            n = self.question_count
+            rows = csv.reader(csvfile)
+            first = next(rows, None)
+            if first is None:
+                return
+            if is_csv_header(first):
+                # Questions ajoutées depuis l'écriture de la ligne : sans réponse ; questions retirées : ignorées
+                for row in rows:
+                    if len(row) >= 3:
+                        answers = (row[1:-2] + [''] * n)[:n]
+                        yield Submission(row[0], answers, row[-2], None, int(row[-1]) if row[-1] else None)
+                return
+            yield from self._iter_legacy([first], n)
+            yield from self._iter_legacy(rows, n)
+
+    def _iter_legacy(self, rows, n):
+        # Fichier sans en-tête : lignes sans score (pseudo, réponses..., IP) ou avec score
+        for row in rows:
+            if len(row) == n + 2:
+                yield Submission(row[0], row[1:-1], row[-1], None, None)
+            elif len(row) == n + 3:
+                yield Submission(row[0], row[1:n + 1], row[n + 1], None, int(row[n + 2]) if row[n + 2] else None)
+
+class SqliteStorage:
+    # Stockage dans une base SQLite en mode WAL : insertions groupées en une transaction par lot,
+    # index sur le quiz, le pseudo, l'IP et l'heure (recherches en O(log n))
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS submissions ('
+        'id INTEGER PRIMARY KEY, quiz TEXT NOT NULL, pseudo TEXT NOT NULL, ip TEXT, '
+        'submitted_at REAL NOT NULL, answers TEXT NOT NULL, score INTEGER);'
+        'CREATE INDEX IF NOT EXISTS submissions_quiz_pseudo ON submissions (quiz, pseudo);'
+        'CREATE INDEX IF NOT EXISTS submissions_quiz_ip ON submissions (quiz, ip);'
+        'CREATE INDEX IF NOT EXISTS submissions_quiz_time ON submissions (quiz, submitted_at);'
+    )
+
+    def __init__(self, file_name, quiz_name):
+        self.file_name = file_name
+        self.quiz_name = quiz_name
+        self.connection = None
+        # Connexion de lecture partagée par les requêtes (la connexion d'écriture appartient au thread d'écriture)
+        self.reader = self._connect(check_same_thread=False)
+        self.reader.executescript(self.SCHEMA)
+        # Base créée avant l'enregistrement du score : ajout de la colonne
+        columns = [row[1] for row in self.reader.execute('PRAGMA table_info(submissions)')]
+        if 'score' not in columns:
+            with self.reader:
+                self.reader.execute('ALTER TABLE submissions ADD COLUMN score INTEGER')
+        self.read_lock = threading.Lock()
+
+    def _connect(self, check_same_thread=True):
+        connection = sqlite3.connect(self.file_name, check_same_thread=check_same_thread)
+        connection.execute('PRAGMA journal_mode=WAL')
+        # NORMAL : pas de fsync à chaque transaction en WAL, la synchronisation se fait dans sync()
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def open(self):
+        # Appelé par le thread d'écriture
+        self.connection = self._connect()
+
+    def write_batch(self, submissions):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO submissions (quiz, pseudo, ip, submitted_at, answers, score) VALUES (?, ?, ?, ?, ?, ?)',
+                [(self.quiz_name, submission.pseudo, submission.ip, submission.submitted_at,
+                  json.dumps(submission.answers), submission.score) for submission in submissions],
+            )
+
+    def sync(self):
+        # Le point de contrôle synchronise le journal WAL sur le disque puis le recopie dans la base
+        self.connection.execute('PRAGMA wal_checkpoint(PASSIVE)')
+
+    def close(self):
+        self.sync()
+        self.connection.close()
+
+    def has_submitted(self, pseudo):
+        # Ce pseudo a-t-il déjà répondu à ce quiz ? Recherche dans l'index (quiz, pseudo) des lignes enregistrées
+        # (réponses d'une exécution précédente ; les réponses encore en file sont vues par SubmissionIndex)
+        with self.read_lock:
+            return self.reader.execute(
+                'SELECT 1 FROM submissions WHERE quiz = ? AND pseudo = ? LIMIT 1', (self.quiz_name, pseudo)
+            ).fetchone() is not None
+
+    def iter_submissions(self):
+        # Réponses déjà enregistrées pour ce quiz, dans l'ordre d'arrivée
+        with self.read_lock:
+            rows = self.reader.execute(
+                'SELECT pseudo, answers, ip, submitted_at, score FROM submissions WHERE quiz = ? ORDER BY id',
+                (self.quiz_name,),
+            ).fetchall()
+        for pseudo, answers, ip_address, submitted_at, score in rows:
+            yield Submission(pseudo, json.loads(answers), ip_address, submitted_at, score)
+
+    def export_csv(self, file_name, question_count):
+        # Export au format de responses.csv (en-tête, puis pseudo, réponses..., IP, score)
+        count = 0
+        with open(file_name, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(csv_header(question_count))
+            for submission in self.iter_submissions():
+                writer.writerow([submission.pseudo, *submission.answers, submission.ip, submission.score])
+                count += 1
+        return count
+
+class ResponseWriter:
+    # Écriture des réponses en arrière-plan : la requête ne fait qu'une mise en file,
+    # un thread dédié regroupe les réponses en lots et les écrit dans leur stockage (CSV ou SQLite),
+    # un lot par stockage (un stockage par quiz avec ETMLQuizHost). Les stockages sont ouverts à leur
+    # première écriture et, si idle_timeout est donné, fermés après ce délai sans écriture.
+    # Une erreur du stockage (disque plein, base verrouillée, droits) est signalée à on_error et le lot est
+    # gardé puis réessayé toutes les retry_interval secondes, sans arrêter le thread ; les réponses suivantes
+    # de ce stockage attendent derrière lui pour garder l'ordre.
+    # À l'arrêt, toutes les réponses acceptées sont écrites et synchronisées sur le disque.
+
+    STOP = object()  # Marqueur de fin placé dans la file à l'arrêt
+
+    def __init__(self, storage=None, queue_size=0, batch_size=500, flush_interval=0.05, fsync_interval=1.0,
+                 idle_timeout=None, write_latency=None, retry_interval=1.0, on_error=None):
+        self.storage = storage  # Stockage par défaut de submit
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.idle_timeout = idle_timeout
+        self.write_latency = write_latency  # Mesure de la durée d'écriture d'un lot (secondes), optionnelle
+        self.retry_interval = retry_interval
+        self.on_error = on_error  # Appelé avec (action, stockage, exception) ; sinon journal du module
+        self.lock = threading.Lock()
+        self.closed = False
+        self.pending = {}  # stockage -> réponses en file, pas encore écrites
+        # État du thread d'écriture, lu par /metrics : erreurs depuis le démarrage, dernière erreur
+        # et réponses dont l'écriture a échoué, en attente d'un nouvel essai
+        self.errors = 0
+        self.last_error = None
+        self.failed = {}
+        self.thread = threading.Thread(target=self._run, name='response-writer', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, submission, timeout=0, storage=None):
+        # Appelé dans la requête : mise en file ; si la file est pleine, attend au plus 'timeout' secondes
+        # qu'une place se libère. False si la file est restée pleine ou si l'écriture est arrêtée
+        storage = storage or self.storage
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                if self.closed:
+                    return False
+                try:
+                    self.queue.put_nowait((storage, submission))
+                    self.pending[storage] = self.pending.get(storage, 0) + 1
+                    return True
+                except queue.Full:
+                    pass
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)  # Attente coopérative avec eventlet/gevent (module time patché)
+
+    def pending_count(self, storage=None):
+        # Réponses de ce stockage acceptées mais pas encore écrites
+        with self.lock:
+            return self.pending.get(storage or self.storage, 0)
+
+    def failed_count(self):
+        # Réponses dont l'écriture a échoué, en attente d'un nouvel essai
+        with self.lock:
+            return sum(len(submissions) for submissions in self.failed.values())
+
+    @property
+    def healthy(self):
+        # Thread d'écriture en marche et aucun lot en échec
+        return self.thread.is_alive() and not self.failed
+
+    def close(self):
+        # Arrêt propre : plus aucune réponse acceptée, puis écriture de toutes celles en attente
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.put(self.STOP)
+        self.thread.join()
+
+    def _next_batch(self, timeout):
+        # Attend une première réponse (au plus 'timeout' secondes, None = sans limite)
+        # puis regroupe celles qui arrivent pendant flush_interval
+        batch = [self.queue.get(timeout=timeout)]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not self.STOP:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _report(self, action, storage, error):
+        self.errors += 1
+        self.last_error = f'{action}: {type(error).__name__}: {error}'
+        if self.on_error:
+            self.on_error(action, storage, error)
+        else:
+            logging.getLogger(__name__).error("Écriture des réponses (%s) : %s", action, error, exc_info=error)
+
+    def _write(self, storage, submissions, opened):
+        # Écrit un lot ; en cas d'erreur, le lot est gardé dans self.failed pour un nouvel essai
+        try:
+            if storage not in opened:
+                storage.open()
+                opened[storage] = time.monotonic()
+            start = time.perf_counter()
+            storage.write_batch(submissions)
+        except Exception as error:
+            with self.lock:
+                self.failed[storage] = submissions
+            self._report('write', storage, error)
+            if opened.pop(storage, None) is not None:
+                try:
+                    storage.close()  # Rouvert au prochain essai
+                except Exception:
+                    pass
+            return False
+        if self.write_latency:
+            self.write_latency(time.perf_counter() - start)
+        opened[storage] = time.monotonic()
+        with self.lock:
+            self.pending[storage] -= len(submissions)
+            if not self.pending[storage]:
+                del self.pending[storage]
+        return True
+
+    def _call(self, action, storage):
+        # Synchronisation ou fermeture d'un stockage ; False en cas d'erreur (signalée)
+        try:
+            getattr(storage, action)()
+            return True
+        except Exception as error:
+            self._report(action, storage, error)
+            return False
+
+    def _run(self):
+        opened = {}  # stockage ouvert -> instant de sa dernière écriture
+        unsynced = set()  # Stockages dont des réponses écrites n'ont pas encore été synchronisées sur le disque
+        last_fsync = time.monotonic()
+        last_retry = time.monotonic()
+        while True:
+            try:
+                if unsynced:
+                    timeout = max(0.0, last_fsync + self.fsync_interval - time.monotonic())
+                else:
+                    timeout = self.idle_timeout if opened and self.idle_timeout else None
+                if self.failed:
+                    retry_timeout = max(0.0, last_retry + self.retry_interval - time.monotonic())
+                    timeout = retry_timeout if timeout is None else min(timeout, retry_timeout)
+                batch = self._next_batch(timeout)
+            except queue.Empty:
+                batch = []
+
+            stop = bool(batch) and batch[-1] is self.STOP
+            now = time.monotonic()
+            retry = stop or now - last_retry >= self.retry_interval
+            by_storage = {}
+            with self.lock:
+                for storage, submission in batch[:-1] if stop else batch:
+                    if storage in self.failed:
+                        self.failed[storage].append(submission)  # Derrière le lot en échec, dans l'ordre
+                    else:
+                        by_storage.setdefault(storage, []).append(submission)
+                if retry and self.failed:
+                    by_storage.update(self.failed)
+                    self.failed = {}
+                    last_retry = now
+            for storage, submissions in by_storage.items():
+                if self._write(storage, submissions, opened):
+                    unsynced.add(storage)
+                else:
+                    unsynced.discard(storage)  # Stockage fermé (donc synchronisé) après l'échec
+            if stop:
+                for storage in opened:
+                    self._call('close', storage)  # Synchronise puis ferme le stockage
+                lost = self.failed_count()
+                if lost:
+                    logging.getLogger(__name__).critical("%d réponses n'ont pas pu être écrites", lost)
+                return
+
+            now = time.monotonic()
+            if unsynced and (not batch or now - last_fsync >= self.fsync_interval):
+                for storage in list(unsynced):
+                    if self._call('sync', storage):
+                        unsynced.discard(storage)
+                last_fsync = now
+            if self.idle_timeout:
+                for storage in [storage for storage, last in opened.items()
+                                if storage not in unsynced and storage not in self.failed
+                                and now - last >= self.idle_timeout]:
+                    self._call('close', storage)
+                    del opened[storage]
+
+class Leaderboard:
+    # Classement tenu à jour à chaque réponse sans trier toutes les réponses : tas min des 'size' meilleurs
+    # scores (ajout en O(log size)) et répartition des scores (histogram[score] = nombre de réponses, en O(1)).
+    # À score égal, la réponse reçue la première est classée devant.
+
+    def __init__(self, size, max_score):
+        self.size = size
+        self.heap = []  # (score, -seq, pseudo) ; heap[0] est le moins bien classé des meilleurs
+        self.histogram = [0] * (max_score + 1)
+
+    def add(self, seq, pseudo, score):
+        self.histogram[score] += 1
+        item = (score, -seq, pseudo)
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, item)
+        elif self.heap and item > self.heap[0]:
+            heapq.heapreplace(self.heap, item)
+
+    def top(self):
+        # Meilleures réponses, de la première à la dernière place (seules les 'size' meilleures sont triées)
+        return [{'seq': -negative_seq, 'pseudo': pseudo, 'score': score}
+                for score, negative_seq, pseudo in sorted(self.heap, reverse=True)]
+
+class ResultsAggregator:
+    # Totaux des résultats tenus à jour à chaque réponse, en O(nombre de questions) :
+    # réponses par choix, réponses correctes, nombre d'étudiants et classement des scores.
+    # Les réponses sont numérotées (seq = 1, 2, ...) ; le numéro de la dernière est la version des résultats.
+    # Les nouvelles réponses sont diffusées en une seule mise à jour par intervalle.
+    # Lignes au format compact [seq, pseudo, réponse 1, ..., réponse n] (--results-format compact)
+    # ou objet {'seq', 'pseudo', 'responses': {'pseudo', 'Question 1', ..., 'IP'}}.
+
+    def __init__(self, answer_key, labels, compact=False, leaderboard_size=10):
+        self.answer_key = answer_key
+        self.labels = labels
+        self.compact = compact
+        self.leaderboard_size = leaderboard_size
+        self.lock = threading.Lock()
+        self.submissions = 0
+        self.choice_counts = [{} for _ in answer_key]
+        self.correct_counts = [0] * len(answer_key)
+        self.leaderboard = Leaderboard(leaderboard_size, len(answer_key))
+        self.entries = []  # Réponses reçues, dans l'ordre ; entries[seq - 1]
+        self.broadcasted = 0  # Nombre de réponses déjà diffusées
+        # ETag : instance (un redémarrage ne réutilise pas les anciens) et génération (incrémentée à chaque rescore)
+        self.instance = secrets.token_hex(4)
+        self.generation = 0
+
+    @property
+    def version(self):
+        return len(self.entries)
+
+    def _count(self, answers):
+        self.submissions += 1
+        for i, answer in enumerate(answers):
+            counts = self.choice_counts[i]
+            for choice in answer.split(',') if answer else ():
+                counts[choice] = counts.get(choice, 0) + 1
+            if answer == self.answer_key[i]:
+                self.correct_counts[i] += 1
+
+    def _row(self, seq, pseudo, answers, ip_address):
+        # Ligne du tableau des résultats, préparée une seule fois pour toutes les diffusions
+        if self.compact:
+            return [seq, pseudo, *answers]
+        responses = {'pseudo': pseudo}
+        responses.update(zip(self.labels, answers))
+        responses['IP'] = ip_address
+        return {'seq': seq, 'pseudo': pseudo, 'responses': responses}
+
+    def _row_answers(self, row, labels):
+        # Réponses d'une ligne, une par libellé (questions ajoutées depuis : sans réponse)
+        if self.compact:
+            answers = row[2:]
+            return [answers[i] if i < len(answers) else '' for i in range(len(labels))]
+        return [row['responses'].get(label, '') for label in labels]
+
+    def add(self, pseudo, answers, ip_address, score, broadcast=True):
+        with self.lock:
+            self._count(answers)
+            seq = len(self.entries) + 1
+            self.entries.append(self._row(seq, pseudo, answers, ip_address))
+            self.leaderboard.add(seq, pseudo, score)
+            if not broadcast:
+                self.broadcasted = len(self.entries)
+
+    def load(self, storage):
+        # Recharge les réponses déjà enregistrées (redémarrage du serveur) ; les scores sont recalculés
+        # avec la clé de réponses actuelle (quiz modifié depuis, lignes enregistrées sans score)
+        for submission in storage.iter_submissions():
+            self.add(submission.pseudo, submission.answers, submission.ip,
+                     score_answers(submission.answers, self.answer_key), broadcast=False)
+        return self
+
+    def rescore(self, answer_key, labels):
+        # Recalcule les totaux avec la clé de réponses d'un quiz modifié ; les réponses reçues sont conservées
+        # (questions retirées ignorées, questions ajoutées sans réponse)
+        with self.lock:
+            self.answer_key = answer_key
+            self.labels = labels
+            self.submissions = 0
+            self.choice_counts = [{} for _ in answer_key]
+            self.correct_counts = [0] * len(answer_key)
+            self.leaderboard = Leaderboard(self.leaderboard_size, len(answer_key))
+            self.generation += 1
+            for seq, entry in enumerate(self.entries, 1):
+                answers = self._row_answers(entry, labels)
+                self._count(answers)
+                pseudo = entry[1] if self.compact else entry['pseudo']
+                self.leaderboard.add(seq, pseudo, score_answers(answers, answer_key))
+
+    def question_stats(self, i):
+        return {
+            'counts': dict(self.choice_counts[i]),
+            'correct': self.correct_counts[i],
+            'percent': round(100 * self.correct_counts[i] / self.submissions) if self.submissions else 0,
+        }
+
+    def _totals(self, rows):
+        return {
+            'version': len(self.entries),
+            'student_count': self.submissions,
+            'rows': rows,
+            'questions': {i: self.question_stats(i) for i in range(len(self.answer_key))},
+            'leaderboard': self.leaderboard.top(),
+            'histogram': list(self.leaderboard.histogram),
+        }
+
+    def take_delta(self):
+        # Mise à jour groupée depuis la dernière diffusion, None s'il n'y a rien de nouveau
+        with self.lock:
+            if self.broadcasted == len(self.entries):
+                return None
+            rows = self.entries[self.broadcasted:]
+            self.broadcasted = len(self.entries)
+            return self._totals(rows)
+
+    def snapshot(self, since=0):
+        # État complet des totaux et réponses reçues après la version 'since'
+        with self.lock:
+            return self._totals(self.entries[max(since, 0):])
+
+    def tagged_snapshot(self, since=0):
+        # snapshot(since) et son ETag, lus sous le même verrou
+        with self.lock:
+            return self._totals(self.entries[max(since, 0):]), self.etag(since)
+
+    def etag(self, since):
+        # ETag de l'état renvoyé par snapshot(since) : change à chaque réponse, à chaque rescore
+        # et à chaque démarrage du serveur
+        return f'{self.instance}-{self.generation}-{self.version}-{since}'
+
+def snapshot_response(app, request, aggregator):
+    # Réponse Flask de /results/snapshot pour les tableaux de bord qui (re)chargent la page :
+    # totaux et réponses reçues après la version 'since' ; une requête If-None-Match sans nouvelle
+    # réponse reçoit 304 sans que l'état soit sérialisé
+    since = request.args.get('since', 0, type=int)
+    etag = aggregator.etag(since)
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+    if request.if_none_match.contains(etag):
+        return app.response_class(status=304, headers=headers)
+
+    snapshot, etag = aggregator.tagged_snapshot(since)
+    headers['ETag'] = f'"{etag}"'
+    return app.response_class(app.json.dumps(snapshot), mimetype='application/json', headers=headers)
+
+class TokenBucket:
+    # Limitation du débit par client (seau à jetons) : 'burst' envois d'affilée, puis 'rate' par seconde
+    MAX_CLIENTS = 100000  # Au-delà, les clients dont le seau est de nouveau plein sont oubliés
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.buckets = {}  # client -> (jetons restants, instant de la mise à jour)
+
+    def acquire(self, client):
+        # 0 si l'envoi est autorisé, sinon attente en secondes avant le prochain jeton
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self.buckets[client] = (tokens, now)
+                return (1 - tokens) / self.rate
+            if client not in self.buckets and len(self.buckets) >= self.MAX_CLIENTS:
+                refill = self.burst / self.rate
+                self.buckets = {key: value for key, value in self.buckets.items() if now - value[1] < refill}
+            self.buckets[client] = (tokens - 1, now)
+        return 0
+
+class SubmissionIndex:
+    # Réponses acceptées, retrouvées en O(1) par clé d'idempotence (champ submission_key ou en-tête
+    # Idempotency-Key) et par (pseudo, session) : un double clic ou un nouvel envoi n'est enregistré qu'une fois.
+    # Les pseudos réservés par claim_pseudo couvrent les réponses encore en file d'écriture.
+    # L'index est propre au processus (avec --workers, un nouvel essai reçu par un autre processus n'est pas
+    # reconnu) et borné : les entrées plus anciennes que ttl secondes, puis les plus anciennes au-delà de
+    # max_entries, sont oubliées à chaque réservation
+
+    def __init__(self, max_entries=100000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.by_key = OrderedDict()  # Dans l'ordre d'arrivée : les plus anciennes en tête
+        self.by_session = OrderedDict()
+        self.by_pseudo = OrderedDict()
+
+    def _evict(self, index):
+        # Appelé avec self.lock
+        expired = time.time() - self.ttl
+        while index and (len(index) > self.max_entries or next(iter(index.values())).submitted_at < expired):
+            index.popitem(last=False)
+
+    def _entries(self, submission, key, session_id):
+        entries = []
+        if key:
+            entries.append((self.by_key, key))
+        if session_id:
+            entries.append((self.by_session, (submission.pseudo, session_id)))
+        return entries
+
+    def claim(self, submission, key, session_id):
+        # Réserve la réponse ; retourne la réponse déjà acceptée s'il s'agit d'un doublon, sinon None
+        entries = self._entries(submission, key, session_id)
+        with self.lock:
+            for index, entry in entries:
+                self._evict(index)
+                if entry in index:
+                    return index[entry]
+            for index, entry in entries:
+                index[entry] = submission
+                self._evict(index)
+        return None
+
+    def claim_pseudo(self, submission):
+        # Réserve le pseudo de la réponse (un seul envoi par pseudo) ; False s'il a déjà été accepté
+        with self.lock:
+            self._evict(self.by_pseudo)
+            if submission.pseudo in self.by_pseudo:
+                return False
+            self.by_pseudo[submission.pseudo] = submission
+            self._evict(self.by_pseudo)
+        return True
+
+    def release(self, submission, key, session_id):
+        # Annule la réservation d'une réponse refusée (serveur surchargé) : le prochain essai sera accepté
+        with self.lock:
+            entries = self._entries(submission, key, session_id) + [(self.by_pseudo, submission.pseudo)]
+            for index, entry in entries:
+                if index.get(entry) is submission:
+                    del index[entry]
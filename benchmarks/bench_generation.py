@@ -0,0 +1,135 @@
+#########################################################################################
+#                   Banc d'essai : génération HTML/JS des grands quiz                   #
+#########################################################################################
+# Compare l'ancienne génération par concaténation (+=) des chaînes avec le moteur       #
+# par fragments de ETMLQuizBuilder (assemblage par join ou écriture au fil de l'eau).   #
+#                                                                                       #
+# Utilisation : python benchmarks/bench_generation.py [nombre de questions ...]         #
+#               python benchmarks/bench_generation.py > bench_output.txt                #
+#########################################################################################
+
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import ETMLQuizBuilder as builder  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000]
+
+# Anciennes fonctions de génération (concaténation répétée dans les boucles), conservées pour comparaison.
+# Elles remplissent les gabarits actuels avec les mêmes valeurs que le moteur par fragments (fichiers
+# statiques sans empreinte) : les trois méthodes produisent les mêmes fichiers, vérifiés par check_outputs
+def legacy_generate_questionnaire_html(title, quiz):
+    form_html = builder.QUESTIONNAIRE_HEAD.format(title=title, styles=builder.asset_url(None, 'css/styles.css'),
+                                                  socketio_client=builder.socketio_client_url(None),
+                                                  form_script=builder.asset_url(None, 'js/student_form_script.js'),
+                                                  variant_field='')
+    for i, (question, choices, correct_choices) in enumerate(quiz):
+        input_type = "checkbox" if len(correct_choices) > 1 else "radio"
+        form_html += f'<div class="oneQuest" id="{i+1}">\n'
+        form_html += f'<p>{question}</p>\n'
+        for choice in choices:
+            value, text = builder.parse_choice(choice)
+            if choice in correct_choices:
+                form_html += f'<label>\n'
+                form_html += f'<input type="{input_type}" name="question_{i}" value="{value}" data-correct="true" /> {text}\n'
+                form_html += f'</label>\n'
+            else:
+                form_html += f'<label>\n'
+                form_html += f'<input type="{input_type}" name="question_{i}" value="{value}" /> {text}\n'
+                form_html += f'</label>\n'
+        form_html += '</div>\n'
+    form_html += builder.QUESTIONNAIRE_TAIL
+    return form_html
+
+def legacy_generate_student_response_script(quiz):
+    script = builder.RESPONSE_SCRIPT_HEAD
+    for i, (question, _, correct_choices) in enumerate(quiz):
+        script += f"responseKeys[{i}] = {repr(builder.answer_key(correct_choices))};\n    "
+    script += builder.RESPONSE_SCRIPT_TAIL
+    return script
+
+def legacy_generate_results_html(num_questions):
+    html_content = builder.RESULTS_HEAD.format(
+        styles=builder.asset_url(None, 'css/styles.css'),
+        socketio_client=builder.socketio_client_url(None),
+        response_script=builder.asset_url(None, 'js/student_response_script.js'),
+    )
+    for i in range(num_questions):
+        html_content += f'            <th>Question {i+1}</th>\n'
+    html_content += builder.RESULTS_MIDDLE
+    for i in range(num_questions):
+        html_content += f'                <td id="question-stats-{i}">-</td>\n'
+    html_content += builder.RESULTS_TAIL
+    return html_content
+
+def make_quiz(size):
+    # Quiz synthétique de 'size' questions à quatre choix
+    return [
+        (f"{i+1}. Question numéro {i+1} du banc d'essai ?",
+         [f"a) Réponse A{i}", f"b) Réponse B{i} $true$", f"c) Réponse C{i}", f"d) Réponse D{i}"],
+         [f"b) Réponse B{i} $true$"])
+        for i in range(size)
+    ]
+
+def legacy_build(quiz, folder):
+    # Ancienne méthode : grandes chaînes construites par +=, puis écrites
+    builder.save_html(legacy_generate_questionnaire_html("Banc", quiz), os.path.join(folder, "Quest.html"))
+    builder.save_html(legacy_generate_results_html(len(quiz)), os.path.join(folder, "Results.html"))
+    builder.save_html(legacy_generate_student_response_script(quiz), os.path.join(folder, "script.js"))
+
+def joined_build(quiz, folder):
+    # Moteur par fragments, assemblés par join
+    builder.save_html(builder.generate_questionnaire_html("Banc", quiz), os.path.join(folder, "Quest.html"))
+    builder.save_html(builder.generate_results_html(len(quiz)), os.path.join(folder, "Results.html"))
+    builder.save_html(builder.generate_student_response_script(quiz), os.path.join(folder, "script.js"))
+
+def streamed_build(quiz, folder):
+    # Moteur par fragments, écrits au fil de l'eau dans les fichiers
+    builder.save_html(builder.iter_questionnaire_html("Banc", quiz), os.path.join(folder, "Quest.html"))
+    builder.save_html(builder.iter_results_html(len(quiz)), os.path.join(folder, "Results.html"))
+    builder.save_html(builder.iter_student_response_script(quiz), os.path.join(folder, "script.js"))
+
+def check_outputs(folder):
+    # Les anciennes fonctions doivent rester équivalentes au moteur actuel, sinon la comparaison n'a plus de sens
+    quiz = make_quiz(3)
+    outputs = []
+    for build in (legacy_build, joined_build, streamed_build):
+        build(quiz, folder)
+        outputs.append([open(os.path.join(folder, name), 'rb').read() for name in ("Quest.html", "Results.html", "script.js")])
+    if not outputs[0] == outputs[1] == outputs[2]:
+        raise SystemExit("Les anciennes fonctions de génération ne correspondent plus aux gabarits actuels")
+
+def measure(build, quiz, folder, repeat=3):
+    # Meilleur temps sur 'repeat' exécutions, puis pic mémoire (tracemalloc) sur une exécution
+    best = min(_timed(build, quiz, folder) for _ in range(repeat))
+    tracemalloc.start()
+    build(quiz, folder)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def _timed(build, quiz, folder):
+    start = time.perf_counter()
+    build(quiz, folder)
+    return time.perf_counter() - start
+
+def main(sizes):
+    print(f"{'questions':>10} | {'méthode':<12} | {'temps (ms)':>10} | {'µs/question':>11} | {'pic mémoire (Mo)':>16}")
+    print("-" * 72)
+    with tempfile.TemporaryDirectory() as folder:
+        check_outputs(folder)
+        for size in sizes:
+            quiz = make_quiz(size)
+            for name, build in (("+= (ancien)", legacy_build), ("join", joined_build), ("flux", streamed_build)):
+                duration, peak = measure(build, quiz, folder)
+                print(f"{size:>10} | {name:<12} | {duration * 1000:>10.1f} | "
+                      f"{duration * 1e6 / size:>11.2f} | {peak / 1e6:>16.2f}")
+            print("-" * 72)
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
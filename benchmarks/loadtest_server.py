@@ -0,0 +1,326 @@
+#########################################################################################
+#                   Test de charge d'un serveur de quiz généré                          #
+#########################################################################################
+# Lance le serverQuiz.py d'un module (copié dans un dossier temporaire) sur localhost,  #
+# simule N étudiants (GET /, POST /submit avec des réponses aléatoires) et M tableaux   #
+# de bord Socket.IO, puis mesure :                                                      #
+#  - le débit et les latences p50/p95/p99 de /submit                                    #
+#  - le délai de diffusion des réponses aux tableaux de bord (depuis l'envoi)           #
+#  - le délai d'écriture des réponses dans responses.csv (depuis l'envoi)               #
+#                                                                                       #
+# Utilisation :                                                                         #
+#   python benchmarks/loadtest_server.py quiz_module_Exemple --students 500 \           #
+#          --concurrency 50 --dashboards 5 [--mode prod] [--json rapport.json]          #
+#   python benchmarks/loadtest_server.py Exemple.quiz ...  (module construit à la volée)#
+#                                                                                       #
+# Les tableaux de bord nécessitent le client Socket.IO : pip install "python-socketio[client]"
+#########################################################################################
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import ETMLQuizBuilder as builder  # noqa: E402
+
+try:
+    import socketio  # Client Socket.IO (optionnel)
+except ImportError:
+    socketio = None
+
+CHOICE_INPUT_PATTERN = re.compile(r'<input type="(radio|checkbox)" name="question_(\d+)" value="([^"]+)"')
+
+def percentile(values, fraction):
+    # Percentile par rang le plus proche ; None si aucune valeur
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def summarize(values):
+    # Résumé en millisecondes d'une liste de durées en secondes
+    return {
+        'count': len(values),
+        'p50_ms': _ms(percentile(values, 0.50)),
+        'p95_ms': _ms(percentile(values, 0.95)),
+        'p99_ms': _ms(percentile(values, 0.99)),
+        'max_ms': _ms(max(values) if values else None),
+    }
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 2)
+
+def free_port():
+    # Port TCP libre sur localhost
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def prepare_module(target, work_dir):
+    # Copie le module (ou le construit depuis un fichier .quiz) dans un dossier de travail vierge
+    if target.endswith('.quiz'):
+        source_dir = builder.create_quiz_module(target, output_dir=work_dir, verbose=False)['module']
+    else:
+        source_dir = target
+    module_dir = os.path.join(work_dir, 'module')
+    shutil.copytree(source_dir, module_dir, ignore=shutil.ignore_patterns('responses.csv', '*.db*'))
+    return module_dir
+
+def read_question_choices(module_dir):
+    # Choix possibles de chaque question, lus dans le questionnaire généré
+    with open(os.path.join(module_dir, 'templates', 'Quest.html'), 'r', encoding='utf-8') as file:
+        html = file.read()
+    questions = {}
+    for input_type, number, value in CHOICE_INPUT_PATTERN.findall(html):
+        entry = questions.setdefault(int(number), (input_type, []))
+        entry[1].append(value)
+    return [questions[number] for number in sorted(questions)]
+
+def start_server(module_dir, port, mode):
+    # Lance serverQuiz.py et attend qu'il accepte les connexions
+    # Tous les étudiants simulés partagent l'adresse 127.0.0.1 : sans limitation par adresse IP.
+    # Journal limité aux avertissements : stderr n'est lu qu'en cas d'arrêt du serveur
+    process = subprocess.Popen(
+        [sys.executable, 'serverQuiz.py', '--port', str(port), '--mode', mode, '--log-level', 'warning'],
+        cwd=module_dir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        env=dict(os.environ, QUIZ_SUBMIT_RATE='0'),
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Le serveur s'est arrêté :\n" + process.stderr.read().decode('utf-8', 'replace'))
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Le serveur n'a pas démarré dans les 30 secondes")
+
+def stop_server(process):
+    # Arrêt propre (SIGTERM) : le serveur vide sa file d'écriture avant de quitter
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+class Dashboard:
+    # Tableau de bord Socket.IO simulé : note l'heure de réception de chaque réponse diffusée
+    def __init__(self, url):
+        self.received = {}
+        self.client = socketio.Client(reconnection=False)
+        self.client.on('results_delta', self.on_delta)
+        self.client.connect(url, transports=['websocket'])
+
+    def on_delta(self, delta):
+        now = time.perf_counter()
+        for row in delta.get('rows', []):
+            pseudo = row['pseudo'] if isinstance(row, dict) else row[1]
+            self.received.setdefault(pseudo, now)
+
+    def close(self):
+        self.client.disconnect()
+
+class CsvWatcher(threading.Thread):
+    # Surveille responses.csv et note l'heure à laquelle chaque pseudo y apparaît
+    def __init__(self, file_name, interval=0.005):
+        super().__init__(daemon=True)
+        self.file_name = file_name
+        self.interval = interval
+        self.seen = {}
+        self.running = True
+
+    def run(self):
+        position = 0
+        pending = ''
+        while self.running:
+            if os.path.exists(self.file_name):
+                with open(self.file_name, 'r', newline='', encoding='utf-8') as file:
+                    file.seek(position)
+                    data = file.read()
+                    position = file.tell()
+                now = time.perf_counter()
+                pending += data
+                lines = pending.split('\n')
+                pending = lines.pop()
+                for row in csv.reader(lines):
+                    if row:
+                        self.seen.setdefault(row[0], now)
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.join()
+
+class Student:
+    # Étudiant simulé : une connexion HTTP persistante par thread
+    local = threading.local()
+
+    def __init__(self, port, choices, get_page):
+        self.port = port
+        self.choices = choices
+        self.get_page = get_page
+
+    def connection(self):
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        return self.local.connection
+
+    def request(self, method, path, body=None, headers=None):
+        try:
+            connection = self.connection()
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.local.connection = None
+            return 0
+
+    def __call__(self, number):
+        pseudo = f'loadtest-{number}'
+        result = {'pseudo': pseudo}
+
+        if self.get_page:
+            start = time.perf_counter()
+            result['get_status'] = self.request('GET', '/')
+            result['get_latency'] = time.perf_counter() - start
+
+        fields = [('pseudo', pseudo)]
+        for i, (input_type, values) in enumerate(self.choices):
+            picked = random.sample(values, random.randint(1, len(values))) if input_type == 'checkbox' \
+                else [random.choice(values)]
+            fields.extend((f'question_{i}', value) for value in picked)
+        body = urllib.parse.urlencode(fields)
+
+        result['sent'] = time.perf_counter()
+        result['status'] = self.request('POST', '/submit', body,
+                                        {'Content-Type': 'application/x-www-form-urlencoded'})
+        result['latency'] = time.perf_counter() - result['sent']
+        return result
+
+def run_load_test(target, students=200, concurrency=20, dashboards=2, mode='dev', get_page=True, settle=3.0):
+    # Exécute le test de charge et retourne le rapport (dictionnaire)
+    work_dir = tempfile.mkdtemp(prefix='quiz_loadtest_')
+    try:
+        module_dir = prepare_module(target, work_dir)
+        choices = read_question_choices(module_dir)
+        port = free_port()
+        server = start_server(module_dir, port, mode)
+        url = f'http://127.0.0.1:{port}'
+
+        watcher = CsvWatcher(os.path.join(module_dir, 'responses.csv'))
+        watcher.start()
+
+        clients = []
+        if dashboards and socketio is None:
+            print("python-socketio absent : tableaux de bord ignorés (pip install \"python-socketio[client]\")")
+        elif dashboards:
+            clients = [Dashboard(url) for _ in range(dashboards)]
+
+        try:
+            student = Student(port, choices, get_page)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(student, range(students)))
+            elapsed = time.perf_counter() - start
+
+            # Laisse le temps aux dernières diffusions et écritures d'arriver
+            deadline = time.monotonic() + settle
+            while time.monotonic() < deadline and len(watcher.seen) < students:
+                time.sleep(0.05)
+            time.sleep(min(settle, 0.5))
+        finally:
+            for client in clients:
+                client.close()
+            watcher.stop()
+            stop_server(server)
+
+        # Les délais de diffusion et d'écriture sont mesurés depuis l'envoi de la réponse de l'étudiant
+        accepted = [result for result in results if result['status'] == 200]
+        fan_out = [client.received[result['pseudo']] - result['sent']
+                   for client in clients for result in accepted if result['pseudo'] in client.received]
+        csv_lag = [watcher.seen[result['pseudo']] - result['sent']
+                   for result in accepted if result['pseudo'] in watcher.seen]
+        statuses = {}
+        for result in results:
+            statuses[str(result['status'])] = statuses.get(str(result['status']), 0) + 1
+
+        return {
+            'target': target,
+            'mode': mode,
+            'questions': len(choices),
+            'students': students,
+            'concurrency': concurrency,
+            'dashboards': len(clients),
+            'elapsed_s': round(elapsed, 3),
+            'throughput_per_s': round(len(accepted) / elapsed, 1) if elapsed else None,
+            'statuses': statuses,
+            'submit_latency': summarize([result['latency'] for result in accepted]),
+            'page_latency': summarize([result['get_latency'] for result in results if result.get('get_status') == 200]),
+            'broadcast_fan_out': summarize(fan_out),
+            'broadcast_missing': len(accepted) * len(clients) - len(fan_out),
+            'csv_write_lag': summarize(csv_lag),
+            'csv_missing': len(accepted) - len(csv_lag),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def print_report(report):
+    print(f"Module : {report['target']} ({report['questions']} questions, mode {report['mode']})")
+    print(f"{report['students']} étudiants, {report['concurrency']} en parallèle, "
+          f"{report['dashboards']} tableau(x) de bord, {report['elapsed_s']} s")
+    print(f"Débit /submit : {report['throughput_per_s']} réponses/s, statuts HTTP : {report['statuses']}")
+    for label, key in (("Latence /submit", 'submit_latency'), ("Latence GET /", 'page_latency'),
+                       ("Délai de diffusion", 'broadcast_fan_out'), ("Délai d'écriture CSV", 'csv_write_lag')):
+        stats = report[key]
+        print(f"{label:<22}: n={stats['count']:<6} p50={stats['p50_ms']} ms  p95={stats['p95_ms']} ms  "
+              f"p99={stats['p99_ms']} ms  max={stats['max_ms']} ms")
+    print(f"Diffusions manquantes : {report['broadcast_missing']}, lignes CSV manquantes : {report['csv_missing']}")
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge d'un serveur de quiz généré (localhost)")
+    parser.add_argument('target', help="dossier quiz_module_* ou fichier .quiz")
+    parser.add_argument('--students', type=int, default=200, help="nombre d'étudiants simulés (défaut : 200)")
+    parser.add_argument('--concurrency', type=int, default=20, help="requêtes simultanées (défaut : 20)")
+    parser.add_argument('--dashboards', type=int, default=2, help="tableaux de bord Socket.IO (défaut : 2)")
+    parser.add_argument('--mode', choices=['dev', 'prod'], default='dev', help="mode du serveur (défaut : dev)")
+    parser.add_argument('--no-page', action='store_true', help="ne pas charger la page / avant chaque réponse")
+    parser.add_argument('--json', metavar='FICHIER', help="enregistre le rapport au format JSON")
+    parser.add_argument('--fail-p95', type=float, metavar='MS',
+                        help="code de sortie 1 si la latence p95 de /submit dépasse ce seuil")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    report = run_load_test(args.target, args.students, args.concurrency, args.dashboards, args.mode,
+                           get_page=not args.no_page)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    p95 = report['submit_latency']['p95_ms']
+    if args.fail_p95 is not None and (p95 is None or p95 > args.fail_p95):
+        print(f"Échec : latence p95 de /submit {p95} ms > {args.fail_p95} ms")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())